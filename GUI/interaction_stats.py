@@ -0,0 +1,158 @@
+"""
+Latency statistics of the GUI interactions
+
+Every instrumented handler (click, drag, ...) is timed while it updates the game model. The redraw of the frame that
+follows is split into the draw time and the update_errors time and counted for every handler that requested the
+frame, together with the total latency from the event to the end of the frame and the number of canvas items.
+"""
+import bisect
+import json
+import time
+
+# Upper bounds of the histogram buckets in milliseconds, the last bucket collects everything above
+BUCKETS_MS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+PHASES = ("model", "draw", "update_errors", "latency")
+
+
+class LatencyHistogram:
+    """
+    Histogram of durations with fixed buckets (BUCKETS_MS), count, mean and maximum
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        """
+        Count a duration given in seconds
+        """
+        milliseconds = 1000 * seconds
+        self.counts[bisect.bisect_left(BUCKETS_MS, milliseconds)] += 1
+        self.count += 1
+        self.total += milliseconds
+        self.max = max(self.max, milliseconds)
+
+    def mean(self):
+        """
+        Mean duration in milliseconds
+        """
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, fraction):
+        """
+        Upper bound of the bucket that contains the given fraction of all durations, in milliseconds
+        """
+        if not self.count:
+            return 0.0
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= fraction * self.count:
+                return BUCKETS_MS[bucket] if bucket < len(BUCKETS_MS) else self.max
+        return self.max
+
+    def to_dict(self):
+        """
+        Histogram as dictionary for the JSON dump
+        """
+        return {"count": self.count, "mean_ms": self.mean(), "p95_ms": self.quantile(0.95), "max_ms": self.max,
+                "buckets_ms": list(BUCKETS_MS), "counts": self.counts}
+
+
+class InteractionStats:
+    """
+    Collect LatencyHistograms per handler and phase (see PHASES) and the canvas item counts per frame
+    """
+
+    def __init__(self):
+        self.handlers = {}  # handler name -> {phase: LatencyHistogram}
+        self.pending = []  # (handler name, start time) of the events that wait for the next frame
+        self.update_errors_time = 0.0  # time spent in update_errors in the current frame
+        self.frames = 0
+        self.canvas_items = []  # number of canvas items after every frame
+
+    def get_histograms(self, name):
+        """
+        Histograms of the phases of a handler
+        """
+        if name not in self.handlers:
+            self.handlers[name] = {phase: LatencyHistogram() for phase in PHASES}
+        return self.handlers[name]
+
+    def wrap_handler(self, name, handler):
+        """
+        Return handler with time measurement of the model update, the event waits for the next frame afterward
+        """
+        def timed_handler(*args, **kwargs):
+            start = time.perf_counter()
+            result = handler(*args, **kwargs)
+            self.get_histograms(name)["model"].add(time.perf_counter() - start)
+            self.pending.append((name, start))
+            return result
+
+        return timed_handler
+
+    def wrap_update_errors(self, update_errors):
+        """
+        Return update_errors with time measurement, the time is split from the draw time of the frame
+        """
+        def timed_update_errors():
+            start = time.perf_counter()
+            update_errors()
+            self.update_errors_time += time.perf_counter() - start
+
+        return timed_update_errors
+
+    def start_frame(self):
+        """
+        Start the time measurement of a new frame
+        """
+        self.update_errors_time = 0.0
+
+    def end_frame(self, frame_time, canvas_items):
+        """
+        Count a finished frame of frame_time seconds for every handler that requested it
+        """
+        end = time.perf_counter()
+        draw_time = frame_time - self.update_errors_time
+        for name in {name for name, _ in self.pending}:
+            histograms = self.get_histograms(name)
+            histograms["draw"].add(draw_time)
+            histograms["update_errors"].add(self.update_errors_time)
+        for name, start in self.pending:
+            self.get_histograms(name)["latency"].add(end - start)
+        self.pending = []
+        self.frames += 1
+        self.canvas_items.append(canvas_items)
+
+    def summary_lines(self):
+        """
+        Short text of the mean times per handler, for the overlay of the GUI
+        """
+        lines = [f"{'handler':<10}{'n':>4}{'model':>7}{'draw':>7}{'errors':>7}{'p95 lat':>9} (ms)"]
+        for name, histograms in sorted(self.handlers.items()):
+            lines.append(f"{name[:10]:<10}{histograms['model'].count:>4}"
+                         + "".join(f"{histograms[phase].mean():>7.2f}" for phase in PHASES[:3])
+                         + f"{histograms['latency'].quantile(0.95):>9.1f}")
+        if self.canvas_items:
+            lines.append(f"frames: {self.frames}, canvas items: {self.canvas_items[-1]}")
+        return lines
+
+    def to_dict(self):
+        """
+        All statistics as dictionary
+        """
+        return {"handlers": {name: {phase: histogram.to_dict() for phase, histogram in histograms.items()}
+                             for name, histograms in self.handlers.items()},
+                "frames": self.frames,
+                "canvas_items": self.canvas_items}
+
+    def dump(self, file_name):
+        """
+        Write the statistics as JSON file
+        """
+        with open(file_name, "w") as stats_file:
+            json.dump(self.to_dict(), stats_file, indent=2)
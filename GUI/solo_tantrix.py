@@ -10,46 +10,480 @@ Click on a tile to rotate it.  Click and drag to move a tile.
 # import tantrix_gui
 import random
 
-# Core modeling idea - a triangular grid of hexagonal tiles are
-# modeled by integer tuples of the form (h, k, l)
-# where h + k + l == size and h, k, l >= 0.
+import numpy as np
 
-# Each hexagon has a neighbor in one of six directions
-# These directions are modeled by the differences between the 
-# tuples of these adjacent tiles
+from GUI.tile_codes import CODE_INDEX, CODES, COLOR_IDS, DIRECTIONS, ROTATED_CODES, reverse_direction
 
-# Numbered directions for hexagonal grid, ordered clockwise at 60 degree intervals, dictionary,
-# starting with bottom right edge (hexagon orientated with "flat" side down)
-DIRECTIONS = {0: (-1, 0, 1), 1: (-1, 1, 0), 2: (0, 1, -1),
-              3: (1, 0, -1), 4: (1, -1, 0), 5: (0, -1, 1)}
+# Tile id of an empty cell in the array backed board
+NO_TILE = 255
 
+# Color ids of the edges in DIRECTIONS order for every tile and rotation, shape (56, 6, 6)
+EDGE_COLORS = np.array([[[COLOR_IDS[color] for color in rotated_code] for rotated_code in rotations]
+                        for rotations in ROTATED_CODES], dtype=np.uint8)
+EDGE_COLOR_LIST = EDGE_COLORS.tolist()  # the same as nested lists for the lookups of single tiles
 
-def reverse_direction(direction):
-    """
-    Helper function that returns the opposite direction on a hexagonal grid
-    """
-    num_directions = len(DIRECTIONS)
-    return (direction + num_directions // 2) % num_directions
-
-
-# Color codes for ten tiles in Tantrix Solitaire
-# "B" denotes "Blue", "R" denotes "Red", "Y" denotes "Yellow", "G" denotes "Green"
-# Tile coded starting from bottom right edge clockwise
-# CODES = ["BBRRYY", "BBRYYR", "BBYRRY", "BRYBYR", "RBYRYB",
-#                    "YBRYRB", "BBRYRY", "BBYRYR", "YYBRBR", "YYRBRB"]
-CODES = ['BBRYRY', 'BYRBRY', 'RBYYRB', 'BBYRRY', 'RBRYYB', 'YBYRRB', 'BBYRYR',
-         'BBRRYY', 'YBRYRB', 'BBRYYR', 'RBYRYB', 'YYBRRB', 'BBYYRR', 'YBRRYB',
-         'RYGGRY', 'GYRGRY', 'YYRGRG', 'RRYGGY', 'YYGRGR', 'GYRRGY', 'RYRGGY',
-         'YYGGRR', 'YRGYGR', 'YYRGGR', 'RYGRGY', 'YYGRRG', 'YYRRGG', 'GYGRRY',
-         'BBRGRG', 'BRGBGR', 'RBGGRB', 'BBGRRG', 'RBRGGB', 'GBGRRB', 'BBGRGR',
-         'BBRRGG', 'GBRGRB', 'BBRGGR', 'RBGRGB', 'RRBGGB', 'BBGGRR', 'GBRRGB',
-         'BBGYGY', 'BYGBGY', 'GBYYGB', 'BBYGGY', 'GBGYYB', 'YBYGGB', 'BBYGYG',
-         'BBGGYY', 'YBGYGB', 'BBGYYG', 'GBYGYB', 'YYBGGB', 'BBYYGG', 'YBGGYB']
+# Direction of the neighbor's edge facing the edge in direction d, by d
+REVERSED_DIRECTIONS = [reverse_direction(direction) for direction in DIRECTIONS]
+
+# Directions of the two edges of every color of a tile, {color id: (direction, direction)} for every tile and rotation
+SEGMENT_ENDS = [[{color: tuple(direction for direction in range(6) if colors[direction] == color)
+                  for color in set(colors)} for colors in rotations] for rotations in EDGE_COLOR_LIST]
+
+# Seed of the random Zobrist keys, the hash of a board state is the same in every run
+ZOBRIST_SEED = 0x7A4E7
+_zobrist_keys = {}  # (h, k) -> 64 bit keys [tile][rotation] of the cell
+
+# Maximal number of steps in the undo history and number of steps between two snapshots of the board
+HISTORY_SIZE = 1000
+CHECKPOINT_INTERVAL = 50
 
 # Minimal size of grid
 # MINIMAL_GRID_SIZE = 4
 
 
+def get_zobrist_keys(h, k):
+    """
+    Return the random 64 bit Zobrist keys [tile][rotation] of the cell (h, k, l), created on first use from a seed
+    that only depends on h and k, so equal cells have equal keys on boards of every size
+    """
+    if (h, k) not in _zobrist_keys:
+        rng = np.random.default_rng([ZOBRIST_SEED, h, k])
+        _zobrist_keys[h, k] = rng.integers(0, 2 ** 64, size=(len(CODES), 6), dtype=np.uint64).tolist()
+    return _zobrist_keys[h, k]
+
+
+class ColorLines:
+    """
+    Colored lines of a CompactBoard. Every tile has one segment per color, which connects the two edges of that color;
+    segments (h, k, color id) of neighboring tiles are connected if the edge between them has their color. A segment
+    has at most two connections, so every line is a path or a loop (as many connections as segments).
+    Every segment is labeled with the id of its line. Connecting two lines relabels the segments of the shorter one,
+    removing a segment costs O(1) for a loop or the end of a path and relabels the shorter part of a path that is
+    split, so lines and loops are known after every move without walking the board
+    """
+
+    def __init__(self, board):
+        """
+        Create the empty line structure of a board (see CompactBoard.edge_color)
+        """
+        self._board = board
+        self._links = {}  # segment -> connected segments of the neighboring tiles (at most two)
+        self._line = {}  # segment -> id of its line
+        self._members = {}  # line id -> set of the segments of the line
+        self._connections = {}  # line id -> number of connections between the segments of the line
+        self._color_lines = {color: set() for color in COLOR_IDS.values()}  # color id -> ids of the lines
+        self._next_line = 0
+
+    def find(self, segment):
+        """
+        Return the id of the line containing segment
+        """
+        return self._line[segment]
+
+    def _new_line(self, color, segments, connections):
+        """
+        Label the set of segments as new line of the color
+        """
+        line = self._next_line
+        self._next_line += 1
+        self._members[line] = segments
+        self._connections[line] = connections
+        self._color_lines[color].add(line)
+        for segment in segments:
+            self._line[segment] = line
+
+    def _connect(self, segment_a, segment_b):
+        """
+        Connect two segments, the segments of the shorter line are relabeled with the id of the longer one
+        """
+        self._links[segment_a].append(segment_b)
+        self._links[segment_b].append(segment_a)
+        line_a, line_b = self._line[segment_a], self._line[segment_b]
+        if line_a == line_b:  # the connection closes a loop
+            self._connections[line_a] += 1
+            return
+        if len(self._members[line_a]) < len(self._members[line_b]):
+            line_a, line_b = line_b, line_a
+        moved = self._members.pop(line_b)
+        for segment in moved:
+            self._line[segment] = line_a
+        self._members[line_a] |= moved
+        self._connections[line_a] += self._connections.pop(line_b) + 1
+        self._color_lines[segment_a[2]].discard(line_b)
+
+    def _add_segment(self, segment, ends):
+        """
+        Add the segment with edges in the directions ends and connect it to the segments of the neighboring tiles
+        """
+        self._links[segment] = []
+        self._new_line(segment[2], {segment}, 0)
+        h, k, color = segment
+        index = (h, k, self._board.get_tiling_size() - (h + k))
+        for direction in ends:
+            offset = DIRECTIONS[direction]
+            neighbor_index = (index[0] + offset[0], index[1] + offset[1], index[2] + offset[2])
+            neighbor_segment = (neighbor_index[0], neighbor_index[1], color)
+            if neighbor_segment in self._line and \
+                    self._board.edge_color(neighbor_index, REVERSED_DIRECTIONS[direction]) == color:
+                self._connect(segment, neighbor_segment)
+
+    def _shorter_part(self, start_a, start_b):
+        """
+        Return the set of segments of the shorter of the two paths that start at start_a and start_b, both paths are
+        walked in turns, so at most twice the length of the shorter path is visited
+        """
+        walks = [[start_a], [start_b]]
+        previous = [None, None]
+        while True:
+            for side, walk in enumerate(walks):
+                following = [segment for segment in self._links[walk[-1]] if segment != previous[side]]
+                if not following:
+                    return set(walk)
+                previous[side] = walk[-1]
+                walk.append(following[0])
+
+    def _remove_segment(self, segment):
+        """
+        Remove a segment and its connections, a path through it is split in two lines
+        """
+        line = self._line.pop(segment)
+        neighbors = self._links.pop(segment)
+        members = self._members[line]
+        was_loop = self._connections[line] == len(members)
+        members.discard(segment)
+        self._connections[line] -= len(neighbors)
+        for neighbor in neighbors:
+            self._links[neighbor].remove(segment)
+        if not members:
+            del self._members[line], self._connections[line]
+            self._color_lines[segment[2]].discard(line)
+        elif len(neighbors) == 2 and not was_loop:  # the rest of a loop stays one path, a path is split
+            part = self._shorter_part(*neighbors)
+            members -= part
+            self._connections[line] -= len(part) - 1
+            self._new_line(segment[2], part, len(part) - 1)
+
+    def add_tile(self, index, tile, rotation):
+        """
+        Add the segments of a tile placed on the board
+        """
+        for color, ends in SEGMENT_ENDS[tile][rotation].items():
+            self._add_segment((index[0], index[1], color), ends)
+
+    def remove_tile(self, index, tile, rotation):
+        """
+        Remove the segments of a tile (before it is removed from the board)
+        """
+        for color in SEGMENT_ENDS[tile][rotation]:
+            self._remove_segment((index[0], index[1], color))
+
+    def get_lines(self, color):
+        """
+        Return (number of tiles, is loop) of every line of the color (id or letter)
+        """
+        color = COLOR_IDS.get(color, color)
+        return [(len(self._members[line]), self._connections[line] == len(self._members[line]))
+                for line in self._color_lines[color]]
+
+    def get_loop_lengths(self, color):
+        """
+        Return the numbers of tiles of the loops of the color (id or letter)
+        """
+        return [length for length, is_loop in self.get_lines(color) if is_loop]
+
+
+class CompactBoard:
+    """
+    Board of the triangular grid, stores a tile id and a rotation per cell (h, k, l) in two bytearrays indexed by
+    h * (tiling_size + 1) + k, the codes of the placed tiles as dictionary {index: code} in placing order,
+    the Zobrist hash of the placed tiles (XOR of the keys of get_zobrist_keys) and the ColorLines of the tiles,
+    all are updated with every set_tile and clear_tile. The arrays of get_tiles and get_rotations are numpy views of
+    the bytearrays for bulk operations (see batch_mismatches)
+    """
+
+    def __init__(self, tiling_size):
+        """
+        Create an empty board for the triangular grid with h + k + l == tiling_size
+        """
+        self._tiling_size = tiling_size
+        self._side = tiling_size + 1
+        self._tiles = bytearray([NO_TILE]) * (self._side * self._side)
+        self._rotations = bytearray(self._side * self._side)
+        self._tile_value = {}
+        self._hash = 0
+        self._lines = ColorLines(self)
+
+    def __len__(self):
+        """
+        Return the number of placed tiles
+        """
+        return len(self._tile_value)
+
+    def get_tiles(self):
+        """
+        Return the tile ids (NO_TILE for empty cells) as uint8 array of shape (size + 1, size + 1), a view of the board
+        """
+        return np.frombuffer(self._tiles, dtype=np.uint8).reshape(self._side, self._side)
+
+    def get_rotations(self):
+        """
+        Return the tile rotations as uint8 array of shape (size + 1, size + 1), a view of the board
+        """
+        return np.frombuffer(self._rotations, dtype=np.uint8).reshape(self._side, self._side)
+
+    def get_tile_value(self):
+        """
+        Return the dictionary of tile positions and codes, it is kept up to date by the board and must not be changed
+        """
+        return self._tile_value
+
+    def get_hash(self):
+        """
+        Return the 64 bit Zobrist hash of the placed tiles
+        """
+        return self._hash
+
+    def get_lines(self):
+        """
+        Return the ColorLines of the placed tiles
+        """
+        return self._lines
+
+    def get_tiling_size(self):
+        """
+        Return the size of the triangular grid
+        """
+        return self._tiling_size
+
+    def contains(self, index):
+        """
+        Return whether index is a cell of the triangular grid
+        """
+        return min(index) >= 0 and sum(index) == self._tiling_size
+
+    def has_tile(self, index):
+        """
+        Return whether a tile is placed on the cell with given index
+        """
+        return tuple(index) in self._tile_value
+
+    def get_tile(self, index):
+        """
+        Return (tile id, rotation) of the tile at cell with given index
+        """
+        cell = index[0] * self._side + index[1]
+        return self._tiles[cell], self._rotations[cell]
+
+    def set_tile(self, index, tile, rotation):
+        """
+        Place the tile with given id and rotation on the cell with given index
+        """
+        if not self.contains(index):
+            raise IndexError(f"{index} is not a cell of the grid of size {self._tiling_size}")
+        index = tuple(index)
+        cell = index[0] * self._side + index[1]
+        rotation %= 6
+        keys = get_zobrist_keys(index[0], index[1])
+        if self._tiles[cell] != NO_TILE:  # remove the replaced tile from the hash and the lines
+            old_tile, old_rotation = self._tiles[cell], self._rotations[cell]
+            self._hash ^= keys[old_tile][old_rotation]
+            self._lines.remove_tile(index, old_tile, old_rotation)
+        self._tiles[cell] = tile
+        self._rotations[cell] = rotation
+        self._tile_value[index] = ROTATED_CODES[tile][rotation]
+        self._hash ^= keys[tile][rotation]
+        self._lines.add_tile(index, tile, rotation)
+
+    def clear_tile(self, index):
+        """
+        Remove the tile from the cell with given index
+        """
+        index = tuple(index)
+        if index in self._tile_value:
+            cell = index[0] * self._side + index[1]
+            tile, rotation = self._tiles[cell], self._rotations[cell]
+            self._hash ^= get_zobrist_keys(index[0], index[1])[tile][rotation]
+            self._lines.remove_tile(index, tile, rotation)
+            self._tiles[cell] = NO_TILE
+            self._rotations[cell] = 0
+            del self._tile_value[index]
+
+    def indices(self):
+        """
+        Return the indices of all cells with a tile, ordered by h and k
+        """
+        return sorted(self._tile_value)
+
+    def edge_color(self, index, direction):
+        """
+        Return the color id of the tile edge in given direction
+        """
+        cell = index[0] * self._side + index[1]
+        return EDGE_COLOR_LIST[self._tiles[cell]][self._rotations[cell]][direction]
+
+    def count_mismatches(self, index):
+        """
+        Return the number of edges of the tile at given index that do not match the color of the neighboring tile,
+        only the six neighboring cells are read
+        """
+        h, k = index[0], index[1]
+        cell = h * self._side + k
+        colors = EDGE_COLOR_LIST[self._tiles[cell]][self._rotations[cell]]
+        mismatches = 0
+        for direction, offset in DIRECTIONS.items():
+            neighbor_h, neighbor_k = h + offset[0], k + offset[1]
+            if neighbor_h < 0 or neighbor_k < 0 or neighbor_h + neighbor_k > self._tiling_size:
+                continue
+            neighbor = neighbor_h * self._side + neighbor_k
+            neighbor_tile = self._tiles[neighbor]
+            if neighbor_tile != NO_TILE and colors[direction] != \
+                    EDGE_COLOR_LIST[neighbor_tile][self._rotations[neighbor]][REVERSED_DIRECTIONS[direction]]:
+                mismatches += 1
+        return mismatches
+
+
+class MoveHistory:
+    """
+    Bounded undo/redo log of the moves of a Tantrix game, every step is stored as small record:
+    ("rotate", index, steps), ("move", from_index, to_index) (moves or swaps the tiles), ("shift", direction),
+    ("shuffle", seed), ("pyramid",) or ("load", snapshot) for a board changed outside the recorded moves.
+    A snapshot of the board is kept every checkpoint_interval steps, so every state is restored by replaying at most
+    checkpoint_interval records. The oldest steps are dropped checkpoint by checkpoint when more than max_size steps
+    are stored
+    """
+
+    def __init__(self, snapshot, max_size=HISTORY_SIZE, checkpoint_interval=CHECKPOINT_INTERVAL):
+        """
+        Start the history at the board state snapshot (see Tantrix.get_snapshot)
+        """
+        self.max_size = max_size
+        self.checkpoint_interval = max(1, min(checkpoint_interval, max_size))
+        self.first = 0  # step number of the oldest state that can be restored
+        self.position = 0  # step number of the current state
+        self._records = []  # record of the step from state first + i to state first + i + 1
+        self._checkpoints = {0: snapshot}  # step number -> snapshot of the board
+
+    def __len__(self):
+        """
+        Return the number of stored steps
+        """
+        return len(self._records)
+
+    def can_undo(self):
+        """
+        Return whether there is a step to undo
+        """
+        return self.position > self.first
+
+    def can_redo(self):
+        """
+        Return whether there is an undone step to redo
+        """
+        return self.position < self.first + len(self._records)
+
+    def get_record(self, step):
+        """
+        Return the record of the step from state step to state step + 1
+        """
+        return self._records[step - self.first]
+
+    def add(self, record):
+        """
+        Append the record of a new step, the undone steps are discarded
+        """
+        del self._records[self.position - self.first:]
+        for step in [step for step in self._checkpoints if step > self.position]:
+            del self._checkpoints[step]
+        self._records.append(record)
+        self.position += 1
+        if len(self._records) > self.max_size:
+            later_checkpoints = [step for step in self._checkpoints if step > self.first]
+            if later_checkpoints:
+                oldest = min(later_checkpoints)
+                del self._records[:oldest - self.first]
+                del self._checkpoints[self.first]
+                self.first = oldest
+
+    def checkpoint_due(self):
+        """
+        Return whether a snapshot of the current state should be added
+        """
+        return self.position % self.checkpoint_interval == 0 and self.position not in self._checkpoints
+
+    def add_checkpoint(self, snapshot):
+        """
+        Store the snapshot of the current state
+        """
+        self._checkpoints[self.position] = snapshot
+
+    def get_checkpoint(self, step):
+        """
+        Return (step number, snapshot) of the latest checkpoint at or before step
+        """
+        checkpoint = max(checkpoint for checkpoint in self._checkpoints if checkpoint <= step)
+        return checkpoint, self._checkpoints[checkpoint]
+
+
+def get_inverse_record(record):
+    """
+    Return the record that reverts a step of MoveHistory, None for steps that cannot be reverted from the record
+    alone (shuffle, pyramid, load)
+    """
+    if record[0] == "rotate":
+        return "rotate", record[1], -record[2]
+    if record[0] == "move":
+        return "move", record[2], record[1]
+    if record[0] == "shift":
+        return "shift", reverse_direction(record[1])
+    return None
+
+
+def get_grid_neighbors(tiling_size):
+    """
+    Return the neighbor table of the flattened [h, k] cells of a triangular grid as array of shape (cells, 6),
+    entry [cell, direction] is the flat index of the neighboring cell or -1 if it lies outside the grid
+    """
+    side = tiling_size + 1
+    _h, _k = np.divmod(np.arange(side * side), side)
+    neighbors = np.full((side * side, len(DIRECTIONS)), -1, dtype=np.int64)
+    for direction, offset in DIRECTIONS.items():
+        neighbor_h, neighbor_k = _h + offset[0], _k + offset[1]
+        inside = (_h + _k <= tiling_size) & (neighbor_h >= 0) & (neighbor_k >= 0) & \
+                 (neighbor_h + neighbor_k <= tiling_size)
+        neighbors[inside, direction] = neighbor_h[inside] * side + neighbor_k[inside]
+    return neighbors
+
+
+def batch_mismatches(tiles, rotations, neighbors=None, return_masks=False):
+    """
+    Count the mismatching edges of many boards in one vectorized pass
+    :param tiles: stacked tile ids (NO_TILE for empty cells), either of shape (boards, size + 1, size + 1) like
+                  CompactBoard or of shape (boards, cells) together with neighbors
+    :param rotations: stacked rotations of the same shape as tiles
+    :param neighbors: neighbor table of shape (cells, 6) in DIRECTIONS order with -1 for missing neighbors,
+                      computed with get_grid_neighbors for the CompactBoard layout if None
+    :param return_masks: if true, also return the per-edge mismatch masks
+    :return: number of mismatches per board (and boolean masks of shape tiles.shape + (6,), an edge is marked for
+             both adjacent tiles)
+    """
+    tiles = np.asarray(tiles)
+    rotations = np.asarray(rotations)
+    if neighbors is None:
+        neighbors = get_grid_neighbors(tiles.shape[-1] - 1)
+    flat_tiles = tiles.reshape(tiles.shape[0], -1)
+    occupied = flat_tiles != NO_TILE
+    colors = EDGE_COLORS[np.where(occupied, flat_tiles, 0), rotations.reshape(flat_tiles.shape) % 6]
+    colors[~occupied] = 0  # empty cells have no edge colors
+    reversed_directions = np.array([reverse_direction(direction) for direction in DIRECTIONS])
+    has_neighbor = neighbors >= 0
+    neighbor_colors = colors[:, np.where(has_neighbor, neighbors, 0), reversed_directions]
+    masks = has_neighbor & (colors != 0) & (neighbor_colors != 0) & (colors != neighbor_colors)
+    mismatches = masks.sum(axis=(1, 2)) // 2  # mismatched edges are marked for both tiles
+    if return_masks:
+        return mismatches, masks.reshape(tiles.shape + (len(DIRECTIONS),))
+    return mismatches
+
+
 class Tantrix:
     """
     Basic Tantrix game class
@@ -73,46 +507,43 @@ class Tantrix:
     #             self.place_tile(grid_index, CODES[_counter])
     #             _counter += 1
 
-    def __init__(self, puzzle, tiling_size, start_grid_index=None, transition_edges=None):
+    def __init__(self, puzzle, tiling_size, start_grid_index=None, tile_offsets=None):
         """
         Create a triangular grid of hexagons with size + 1 tiles on each side.
         :param puzzle: list of tile CODES
         :param tiling_size: Size of the pyramid that creates the board (side length)
         :param start_grid_index: Grid index, from which on the board will be initialized
-        :param transition_edges: Hexagon edges (see DIRECTIONS),
-                                 where the transitions from tile to tile will be happening
+        :param tile_offsets: Grid index offsets (h, k, l) of the tiles relative to start_grid_index
         """
         self._tiling_size = None
         self._puzzle_size = len(puzzle)  # number of tiles in puzzle
-        if tiling_size is not None:
-            self._pyramid_size = tiling_size - 2
+        self.update_pyramid_size()
+        if tiling_size is not None:  # the board may be larger than the pyramid to fit the given arrangement
             self._tiling_size = tiling_size
         else:
-            self.update_pyramid_size()
             self.update_tiling_size()
         self._grid_value = None
 
-        # Initialize dictionary tile_value to contain codes for
-        # tiles in grid
-        self._tile_value = {}
+        # Initialize the array backed board that contains the
+        # tiles in grid, the number of mismatching edges is kept up to date on every change
+        self._board = CompactBoard(self._tiling_size)
+        self._mismatches = 0
+        self._history = None  # MoveHistory of the moves, started after the tiles are placed
+        self._recording = True  # False while steps of the history are replayed
         init_failed = 1
         break_occurred = False  # Track if a break occurs
-        if start_grid_index and transition_edges is not None:  # try to draw exact tile arrangement into board
-            curr_grid_index = start_grid_index
-            self.place_tile(index=curr_grid_index, code=puzzle[0])
-            # print(f"{transition_edges=}")
-            for transition_index in range(self._puzzle_size - 1):  # = range(len(transition_edges))
-                # print(f"{transition_index=}")
-                curr_grid_index = self.get_neighbor(curr_grid_index, transition_edges[transition_index])
-                if sum(curr_grid_index) > self._tiling_size:  # if next to be placed tile is outside triangular grid
+        if start_grid_index and tile_offsets is not None:  # try to draw exact tile arrangement into board
+            for code, offset in zip(puzzle, tile_offsets):
+                grid_index = tuple([start_grid_index[_dim] + offset[_dim] for _dim in range(3)])
+                if not self._board.contains(grid_index):  # if tile to be placed is outside triangular grid
                     break_occurred = True
                     break
-                self.place_tile(index=tuple(curr_grid_index), code=puzzle[transition_index + 1])
+                self.place_tile(index=grid_index, code=code)
             if not break_occurred:  # Only set init_failed to 0 if no break occurred
                 init_failed = 0
 
         if init_failed:  # failed, restarting by placing tiles in ascending field order
-            self._tile_value = {}  # reset the board in case initialization failed
+            self.clear_board()  # reset the board in case initialization failed
             _counter = 0
             _index_shift = 0
             _offset = self._puzzle_size - self._pyramid_size * (self._pyramid_size - 1) // 2
@@ -127,8 +558,11 @@ class Tantrix:
                     self.place_tile(grid_index, puzzle[_counter])
                     _counter += 1
                     if _counter >= self._puzzle_size:
-                        return
-            if _index_shift:  # Place the remaining tiles that do not complete an entire pyramid side
+                        break
+                if _counter >= self._puzzle_size:
+                    break
+            # Place the remaining tiles that do not complete an entire pyramid side
+            if _index_shift and _counter < self._puzzle_size:
                 _h = 1
                 _k = self._pyramid_size - 2
                 _l = self._tiling_size - (_h + _k)
@@ -140,18 +574,38 @@ class Tantrix:
                     grid_index = self.get_neighbor(grid_index, direction=4)
                     self.place_tile(tuple(grid_index), puzzle[_counter])
                     _counter += 1
+        self._history = MoveHistory(self.get_snapshot())  # undo/redo log, starting at the initial board
 
     def __str__(self):
         """
         Return string of dictionary of tile positions and values
         """
-        return str(self._tile_value)
+        return str(self.get_tile_value())
 
     def get_tile_value(self):
         """
-        Return dictionary of tile positions and values
+        Return dictionary of tile positions and values, kept up to date by the board on every move (do not change it)
         """
-        return self._tile_value
+        return self._board.get_tile_value()
+
+    def get_board(self):
+        """
+        Return the array backed board
+        """
+        return self._board
+
+    def get_mismatches(self):
+        """
+        Return the number of mismatching edges between adjacent tiles
+        """
+        return self._mismatches
+
+    def get_hash(self):
+        """
+        Return the Zobrist hash of the board state (placed tiles and rotations), kept up to date by every move,
+        usable as key of seen states without serializing the board
+        """
+        return self._board.get_hash()
 
     def get_tiling_size(self):
         """
@@ -190,71 +644,218 @@ class Tantrix:
         """
         Return whether a tile with given index exists
         """
-        return index in self._tile_value  # boolean return
+        return self._board.has_tile(index)  # boolean return
+
+    def count_tile_mismatches(self, index):
+        """
+        Return the number of edges of the tile at given index that do not match the color of the neighboring tile
+        """
+        return self._board.count_mismatches(index)
+
+    def clear_board(self):
+        """
+        Remove all tiles from the board
+        """
+        self._board = CompactBoard(self._tiling_size)
+        self._mismatches = 0
+
+    def get_snapshot(self):
+        """
+        Return a copy of the tile and rotation arrays of the board
+        """
+        return self._board.get_tiles().copy(), self._board.get_rotations().copy()
+
+    def load_snapshot(self, snapshot):
+        """
+        Replace the tiles on the board by the ones of a snapshot (see get_snapshot), recorded in the history
+        """
+        self.clear_board()
+        tiles, rotations = snapshot
+        for _h, _k in zip(*np.nonzero(tiles != NO_TILE)):
+            self.set_tile((int(_h), int(_k), self._tiling_size - int(_h + _k)), int(tiles[_h, _k]),
+                          int(rotations[_h, _k]))
+        self._record(("load", snapshot))
+
+    def record_board(self):
+        """
+        Record the current board as a step of the history, after it was changed outside the recorded moves
+        (for example by a solver)
+        """
+        self._record(("load", self.get_snapshot()))
+
+    def get_history(self):
+        """
+        Return the MoveHistory of the game
+        """
+        return self._history
+
+    def _record(self, record):
+        """
+        Append a step to the history, unless it is replayed from the history
+        """
+        if not self._recording or self._history is None:  # no history while the initial tiles are placed
+            return
+        history = self._history
+        history.add(record)
+        if history.checkpoint_due():
+            history.add_checkpoint(self.get_snapshot())
+
+    def _replay(self, record):
+        """
+        Apply a record of the history to the board without recording it again
+        """
+        self._recording = False
+        try:
+            if record[0] == "rotate":
+                tile, rotation = self._board.get_tile(record[1])
+                self.set_tile(record[1], tile, rotation + record[2])
+            elif record[0] == "move":
+                self.move_tile(record[1], record[2])
+            elif record[0] == "shift":
+                self.try_board_shift(record[1])
+            elif record[0] == "shuffle":
+                self.shuffle_tiles(seed=record[1])
+            elif record[0] == "pyramid":
+                self.move_to_pyramid()
+            elif record[0] == "load":
+                self.load_snapshot(record[1])
+        finally:
+            self._recording = True
+
+    def go_to_step(self, step):
+        """
+        Restore the board state after the given step of the history, by reverting the steps in between or by
+        replaying the steps after the latest checkpoint, whichever is shorter
+        """
+        history = self.get_history()
+        step = max(history.first, min(step, history.first + len(history)))
+        checkpoint, snapshot = history.get_checkpoint(step)
+        if step < history.position and history.position - step <= step - checkpoint and \
+                all(get_inverse_record(history.get_record(_step)) for _step in range(step, history.position)):
+            for _step in range(history.position - 1, step - 1, -1):
+                self._replay(get_inverse_record(history.get_record(_step)))
+        elif checkpoint <= history.position <= step:  # redo from the current state
+            for _step in range(history.position, step):
+                self._replay(history.get_record(_step))
+        else:
+            self._replay(("load", snapshot))
+            for _step in range(checkpoint, step):
+                self._replay(history.get_record(_step))
+        history.position = step
+
+    def undo(self, steps=1):
+        """
+        Undo the last steps, return whether the board changed
+        """
+        history = self.get_history()
+        if not history.can_undo():
+            return False
+        self.go_to_step(history.position - steps)
+        return True
+
+    def redo(self, steps=1):
+        """
+        Redo the last undone steps, return whether the board changed
+        """
+        history = self.get_history()
+        if not history.can_redo():
+            return False
+        self.go_to_step(history.position + steps)
+        return True
+
+    def set_tile(self, index, tile, rotation):
+        """
+        Play the tile with given id and rotation at cell with given index
+        """
+        if self._board.has_tile(index):  # replacing a tile, its edges are checked again below
+            self._mismatches -= self._board.count_mismatches(index)
+        self._board.set_tile(index, tile, rotation)
+        self._mismatches += self._board.count_mismatches(index)
 
     def place_tile(self, index, code):
         """
         Play a tile with code at cell with given index
         """
-        self._tile_value[index] = code
+        tile, rotation = CODE_INDEX[code]
+        self.set_tile(index, tile, rotation)
 
     def remove_tile(self, index):
         """
         Remove a tile at cell with given index
         and return the code value for that tile
         """
-        return self._tile_value.pop(index)
+        if not self._board.has_tile(index):
+            raise KeyError(index)
+        code = self.get_code(index)
+        self._mismatches -= self._board.count_mismatches(index)
+        self._board.clear_tile(index)
+        return code
 
     def rotate_tile(self, index):
         """
         Rotate a tile clockwise at cell with given index
         """
-        _old_string = self._tile_value[index]
-        _new_string = _old_string[-1] + _old_string[:-1]  # Shift the code representation of the tile
-        self._tile_value[index] = _new_string
+        tile, rotation = self._board.get_tile(index)
+        self.set_tile(index, tile, rotation + 1)  # Increase the rotation of the tile
+        self._record(("rotate", index, 1))
 
     def rotate_tile_counterclock(self, index):
         """
         Rotate a tile counter-clockwise at cell with given index
         """
-        _old_string = self._tile_value[index]
-        _new_string = _old_string[1:] + _old_string[0]  # Shift the code representation of the tile
-        self._tile_value[index] = _new_string
+        tile, rotation = self._board.get_tile(index)
+        self.set_tile(index, tile, rotation - 1)
+        self._record(("rotate", index, -1))
+
+    def move_tile(self, from_index, to_index):
+        """
+        Move the tile at from_index onto to_index, the tiles are swapped if to_index is occupied
+        """
+        code = self.remove_tile(from_index)
+        if self._board.has_tile(to_index):
+            self.place_tile(from_index, self.remove_tile(to_index))
+        self.place_tile(to_index, code)
+        self._record(("move", from_index, to_index))
 
-    def shuffle_tiles(self):
+    def shuffle_tiles(self, seed=None):
         """
         Shuffle the tile_value dictionary by randomly permuting the values across different keys.
         Additionally, rotate each tile between 0 and 5 times after placing it.
+        The shuffle only depends on the board and the seed (drawn from the random module if None), so the history
+        stores only the seed
         """
+        if seed is None:
+            seed = random.getrandbits(32)
+        rng = random.Random(seed)
         # Copy the current tile_value dictionary
-        dict_copy = self._tile_value.copy()
-        # Create a list of all tile indices (keys of the dictionary)
-        indices = list(self._tile_value.keys())
+        dict_copy = self.get_tile_value().copy()
+        # Create a list of all tile indices (keys of the dictionary) ordered by h and k, not in placing order, so
+        # replaying the shuffle on a restored board gives the same result
+        original_indices = self._board.indices()
+        indices = original_indices[:]
         # Randomly shuffle the indices
-        random.shuffle(indices)
+        rng.shuffle(indices)
         # Temporary storage for the shuffled tiles
         shuffled_tiles = []
         # Loop through each original index and shuffled index
-        for idx, shuffled_idx in zip(dict_copy.keys(), indices):
+        for idx, shuffled_idx in zip(original_indices, indices):
             # Remove the tile at the current index
             self.remove_tile(idx)
             # Store the shuffled tile and its destination index
             shuffled_tiles.append((idx, dict_copy[shuffled_idx]))
         # Place the shuffled tiles in their new positions
-        for idx, tile in shuffled_tiles:
-            # Place the tile at its new position
-            self.place_tile(idx, tile)
-            # Rotate the placed tile between 0 and 5 times randomly
-            num_rotations = random.randint(0, 5)
-            for _ in range(num_rotations):
-                self.rotate_tile(idx)  # Rotate the tile
+        for idx, code in shuffled_tiles:
+            # Place the tile at its new position, rotated between 0 and 5 times randomly
+            tile, rotation = CODE_INDEX[code]
+            self.set_tile(idx, tile, rotation + rng.randint(0, 5))
+        self._record(("shuffle", seed))
 
     def move_to_pyramid(self):
         """
         Move the tiles to the right of the grid and arrange them in a pyramid shape
         """
-        codes = list(self._tile_value.values())
-        self._tile_value = {}  # Reset the board in case initialization failed
+        codes = [self.get_code(index) for index in self._board.indices()]  # grid order, replays give the same board
+        self.clear_board()  # Reset the board in case initialization failed
         _counter = 0
         _index_shift = 0
         _offset = self._puzzle_size - self._pyramid_size * (self._pyramid_size - 1) // 2
@@ -282,7 +883,8 @@ class Tantrix:
                 grid_index = self.get_neighbor(grid_index, direction=4)
                 self.place_tile(tuple(grid_index), codes[_counter])
                 _counter += 1
-        # print(f"move_to_pyramid: {self._tile_value=}")
+        self._record(("pyramid",))
+        # print(f"move_to_pyramid: {self.get_tile_value()=}")
 
     def new_tiles(self, num_tiles=None, three_colors=None):
         """Create new puzzle by placing new random tiles onto the used and new fields, recieving num_tiles from GUI"""
@@ -301,34 +903,40 @@ class Tantrix:
         if num_tiles != old_num:
             indices = list(self._grid_value)[:num_tiles]  # all fields
         else:
-            indices = list(self._tile_value.keys())[:num_tiles]  # all previously filled fields
+            indices = self._board.indices()[:num_tiles]  # all previously filled fields
+            grid_fields = set(self._grid_value)
+            if not all(grid_index in grid_fields for grid_index in indices):  # board of an enlarged puzzle shrunk
+                indices = list(self._grid_value)[:num_tiles]
         if three_colors and num_tiles <= 14:
             color_set = random.randint(0, 3)  # choose random set of 3 colors
             new_codes = random.sample(CODES[color_set * 14:(color_set + 1) * 14], k=num_tiles)
         else:
             new_codes = random.sample(CODES, k=num_tiles)
-        self._tile_value = {}  # update the attributes of game object
+        self.clear_board()  # update the attributes of game object
         for idx, grid_index in enumerate(indices):
             self.place_tile(grid_index, code=new_codes[idx])
-        # print(f"{self._tile_value=}")
+        self._history = MoveHistory(self.get_snapshot())  # new puzzle on a new board, the history starts again
+        # print(f"{self.get_tile_value()=}")
 
     def try_board_shift(self, moving_edge):
-        """Try to shift all placed tiles into the given direction, do nothing, if board bounds are hurt"""
+        """
+        Try to shift all placed tiles into the given direction, do nothing, if board bounds are hurt.
+        Return whether the tiles were shifted
+        """
         # moving_direction = DIRECTIONS[moving_edge]
-        shifted_tiles = []
-        for grid_index in self._tile_value.keys():
+        shifted_board = CompactBoard(self._tiling_size)
+        for grid_index in self._board.indices():
             shifted_grid_index = self.get_neighbor(grid_index, moving_edge)
-            if sum(shifted_grid_index) != self._tiling_size or \
-                    any([True for coord in shifted_grid_index if coord < 0]):  # if shift would hurt board borders
-                return
-            shifted_tiles.append((tuple(shifted_grid_index), self.get_code(grid_index)))
-        self._tile_value = {}  # clear the board
-        for idx, code in shifted_tiles:  # place the shifted tiles
-            self.place_tile(idx, code)
+            if not shifted_board.contains(shifted_grid_index):  # if shift would hurt board borders
+                return False
+            shifted_board.set_tile(shifted_grid_index, *self._board.get_tile(grid_index))
+        self._board = shifted_board  # a shift keeps all neighborhoods, the mismatch count is unchanged
+        self._record(("shift", moving_edge))
+        return True
 
     def get_grid_coordinates(self):
         """
-        Update the grid coordinates of the current board after change in tiling_size
+        Update the grid coordinates of the current board after change in tiling_size and return them
         """
         grid_coords = []
         for index_i in range(self._tiling_size + 1):
@@ -336,12 +944,13 @@ class Tantrix:
                 grid_index = (index_i, index_j, self._tiling_size - (index_i + index_j))
                 grid_coords.append(grid_index)
         self._grid_value = grid_coords
+        return grid_coords
 
     def get_code(self, index):
         """
         Return the code of the tile at cell with given index
         """
-        return self._tile_value[index]
+        return self._board.get_tile_value()[tuple(index)]
 
     def get_neighbor(self, index, direction):
         """
@@ -352,60 +961,26 @@ class Tantrix:
 
     def is_legal(self, count_errors=0):
         """
-        Check whether a tile configuration obeys color matching rules for adjacent tiles
+        Check whether a tile configuration obeys color matching rules for adjacent tiles, with count_errors also
+        return the number of mismatching edges (the count is kept up to date on every move)
         """
-        mismatches = 0
-        # Check all tiles
-        for tile_index in self._tile_value.keys():  # All fields/tiles
-            # Check all directions for the selected tile
-            for direction in DIRECTIONS.keys():
-                neighbor_index = self.get_neighbor(tile_index, direction)
-                # Check the color for the selected tile and direction
-                if self.tile_exists(neighbor_index):
-                    if (self._tile_value[tile_index][direction] !=
-                            self.get_code(neighbor_index)[reverse_direction(direction)]):
-                        # Different colors so the configuration is illegal
-                        if not count_errors:
-                            return False
-                        else:
-                            mismatches += 1
         if not count_errors:
-            return True
+            return self._mismatches == 0
         else:
-            return [mismatches == 0, mismatches // 2]  # mismatches edges are counted two times
+            return [self._mismatches == 0, self._mismatches]
 
-    def has_loop(self, color):
+    def get_lines(self, color):
         """
-        Check whether a tile configuration has a loop of size 10 of given color
+        Return (number of tiles, is loop) of every line of given color, kept up to date by ColorLines on every move
         """
-        # Check for a legal configuration
-        if not self.is_legal():
-            return False
+        return self._board.get_lines().get_lines(color)
 
-        # Choose arbitrary starting point and find your way to the next tile
-        tile_indices = list(self._tile_value.keys())  # Convert dict_keys to list
-        start_index = tile_indices[0]  # first coordinates e.g. (0, 0, 4), to discover loops
-        start_code = self._tile_value[start_index]  # first tile code
-        next_direction = start_code.find(color)  # find index of edge with color of interest, gets key of direction
-        next_index = self.get_neighbor(start_index, next_direction)
-        current_length = 1
-
-        # Loop through neighboring tiles that match given color
-        while start_index != next_index:
-            current_index = next_index
-            # If there is no tile for the right color there is no loop
-            if not self.tile_exists(current_index):  # no neighbor in this direction
-                return False
-            current_code = self._tile_value[current_index]
-            # Find the next tile
-            if current_code.find(color) == reverse_direction(next_direction):  # get the entering and exiting directions
-                next_direction = current_code.rfind(color)  # search from the right side
-            else:
-                next_direction = current_code.find(color)  # search from the left side
-            next_index = self.get_neighbor(current_index, next_direction)
-            current_length += 1
-
-        return current_length == len(CODES)
+    def has_loop(self, color, length):
+        """
+        Check whether the board has a loop of given color through length tiles (for Tantrix Solitaire the number of
+        tiles of the puzzle)
+        """
+        return length in self._board.get_lines().get_loop_lengths(color)
 
 # tantrix_gui.TantrixGUI(Tantrix(4))
 # tantrix_gui.TantrixGUI(Tantrix(CODES[:]))
@@ -1,11 +1,25 @@
+import collections
+import functools
 import math
+import time
 import tkinter as tk
 
+from GUI.interaction_stats import InteractionStats
+
 # drawing constant
 EDGE_LENGTH = 35  # 40, adjust the size of all elements on canvas (and the window)
 HEX_HEIGHT = math.sqrt(3.0) * EDGE_LENGTH
 
 COLOR_DICT = {"B": "Blue", "R": "Red", "Y": "Yellow", "G": "Green"}
+MAX_FPS = 60  # maximum number of redraws per second, events in between are collected into one frame
+FRAME_HISTORY = 200  # number of frame times kept for inspection
+# grid index offsets (h, k, l) of the six neighbors of a cell
+GRID_STEPS = ((-1, 0, 1), (-1, 1, 0), (0, 1, -1), (1, 0, -1), (1, -1, 0), (0, -1, 1))
+DRAG_TAG = "drag"  # canvas tag of the tile that follows the mouse during drag and drop
+STATS_TAG = "stats"  # canvas tag of the overlay with the interaction statistics
+# handlers whose latency is recorded if the GUI is instrumented
+INSTRUMENTED_HANDLERS = ("click", "drag", "right_click", "handle_keypress", "make_new_puzzle", "shuffle_board",
+                         "undo", "redo")
 
 
 def dist(pt1, pt2):
@@ -15,21 +29,92 @@ def dist(pt1, pt2):
     return math.sqrt((pt1[0] - pt2[0]) ** 2 + (pt1[1] - pt2[1]) ** 2)
 
 
-def make_hexagon(center):
+def make_hexagon(center, edge_length=EDGE_LENGTH):
     """
-    Build a hexagon with edges of length EDGE_LENGTH with specified center
+    Build a hexagon with edges of length edge_length (default EDGE_LENGTH) with specified center
     """
-    hexagon = [[center[0] + EDGE_LENGTH, center[1]],
-               [center[0] + 0.5 * EDGE_LENGTH, center[1] + 0.5 * HEX_HEIGHT],
-               [center[0] - 0.5 * EDGE_LENGTH, center[1] + 0.5 * HEX_HEIGHT],
-               [center[0] - EDGE_LENGTH, center[1]],
-               [center[0] - 0.5 * EDGE_LENGTH, center[1] - 0.5 * HEX_HEIGHT],
-               [center[0] + 0.5 * EDGE_LENGTH, center[1] - 0.5 * HEX_HEIGHT],
-               [center[0] + EDGE_LENGTH, center[1]]]
+    hex_height = math.sqrt(3.0) * edge_length
+    hexagon = [[center[0] + edge_length, center[1]],
+               [center[0] + 0.5 * edge_length, center[1] + 0.5 * hex_height],
+               [center[0] - 0.5 * edge_length, center[1] + 0.5 * hex_height],
+               [center[0] - edge_length, center[1]],
+               [center[0] - 0.5 * edge_length, center[1] - 0.5 * hex_height],
+               [center[0] + 0.5 * edge_length, center[1] - 0.5 * hex_height],
+               [center[0] + edge_length, center[1]]]
     # hexagon = [int(hex_float) for hex_float in hexagon]
     return hexagon
 
 
+@functools.lru_cache(maxsize=None)
+def get_tile_template(code, edge_length):
+    """
+    Compute the canvas items of a tile with the given code centered at the origin, once per code and edge length.
+    Every item is (item_type, coords, options) with item_type "polygon", "line" or "arc" and the flat coordinate list
+    (x, y, x, y, ...) of the polygon, of the line end points or of the bounding box of the arc
+    """
+    template = []
+    # Create the hexagon
+    hexagon = make_hexagon([0, 0], edge_length)
+    template.append(("polygon", tuple(coord for pair in hexagon for coord in pair),
+                     {"outline": "white", "width": 2, "fill": "black"}))
+
+    # Midpoints between each pair of adjacent hexagon points
+    mid_pts = [[0.5 * (hexagon[idx][dim] + hexagon[idx + 1][dim]) for dim in range(2)]  # hexagon contains vertices
+               for idx in range(len(hexagon) - 1)]
+
+    for color in COLOR_DICT.keys():  # cycle through every color on the tiles
+        first = code.find(color)  # find the distance between the two occurrences of the color
+        second = code.rfind(color)  # search from the right side
+        if first == -1:  # color is not part of the tile
+            continue
+        arc = (second - first) % 6  # arc in [1, 2, 3, 4, 5]
+
+        if arc == 3:  # if 3, the color-matching edges are on the hexagons opposing edges
+            # Straight line across the tile (first and second color occurrence)
+            template.append(("line", (mid_pts[first][0], mid_pts[first][1], mid_pts[second][0], mid_pts[second][1]),
+                             {"width": edge_length / 4, "fill": COLOR_DICT[color]}))
+        elif arc == 2 or arc == 4:  # center point is the center of the neighbor tile between the 2 matching edges
+            # Long arc across the tile
+            src = second if arc == 4 else first
+            src = (src + 2) % 6
+            start_ang = 120 + 60 * src
+            offset_ang = (start_ang + 180) * math.pi / 180
+
+            cp = [hexagon[src][0] + edge_length * math.cos(offset_ang),  # center point
+                  hexagon[src][1] + edge_length * math.sin(offset_ang)]  # starting from vertex of hexagon
+            rad = edge_length * 1.5
+
+            # Set the starting and ending angle depending on the edge of the hexagon
+            start_angle = {3: 0, 2: 60, 1: 120, 0: 180, 5: 240, 4: 300}[src] + 1  # minor adjustments
+            end_angle = start_angle + 58
+            template.append(("arc", (cp[0] - rad, cp[1] - rad, cp[0] + rad, cp[1] + rad),
+                             {"style": "arc", "outline": COLOR_DICT[color], "width": edge_length / 4,
+                              "start": start_angle, "extent": end_angle - start_angle}))
+
+        elif arc == 1 or arc == 5:
+            # Short arc between adjacent edges
+            # 120 degree arc, centered around shared corner
+            src = second if arc == 5 else first
+            src = (src + 1) % 6
+            cp = hexagon[src]  # center point of the arc
+            rad = edge_length / 2
+
+            # Set the starting and ending angle depending on the edge of the hexagon
+            start_angle = {2: 0, 1: 60, 0: 120, 5: 180, 4: 240, 3: 300}[src] + 2
+            end_angle = start_angle + 116
+            template.append(("arc", (cp[0] - rad, cp[1] - rad, cp[0] + rad, cp[1] + rad),
+                             {"style": "arc", "outline": COLOR_DICT[color], "width": edge_length / 4,
+                              "start": start_angle, "extent": end_angle - start_angle}))
+    return template
+
+
+def get_cell_tag(grid_index):
+    """
+    Canvas tag of all items drawn for the cell with the given grid index
+    """
+    return "cell_{}_{}_{}".format(*grid_index)
+
+
 def _create_circle_arc(self, x, y, r, **kwargs):
     """
     Draw a circular arc
@@ -53,16 +138,38 @@ class TantrixGUI:
     GUI class for game using Tkinter
     """
 
-    def __init__(self, game, button_callback=None):
+    def __init__(self, game, button_callback=None, solve_callback=None, max_fps=MAX_FPS, stats_file=None,
+                 show_stats=False, load_callback=None):
         """
-        Initialize GUI
+        Initialize GUI, the view is redrawn at most max_fps times per second.
+        With stats_file or show_stats, the latencies of the handlers are recorded (see interaction_stats), shown in
+        an overlay on the canvas (show_stats, toggled with key 'o') and written to stats_file when the window closes
         """
         self.button_callback = button_callback  # Set the callback function for button press
+        self.solve_callback = solve_callback  # Callback that solves the game object in place, see solve_board
+        self.solver = None  # running search of the solve button, None if the solver is idle
+        self.load_callback = load_callback  # Callback that places a stored solution onto the board
         self.current_tile_code = None
         self.mouse_position = None
         self.down_click_index = None
         self.grid_centers = None
         self.corners = None
+        self.corner_edges = None
+        self.drawn_codes = {}  # grid index -> code (None for empty field) of the items currently on the canvas
+        self.full_redraw = True  # the grid changed, all items have to be recreated
+        self.drag_position = None  # position of the floating drag tile on the canvas, None if not drawn
+        self.frame_interval = 1.0 / max_fps  # minimum time between two redraws in seconds
+        self.pending_frame = None  # id of the scheduled redraw (root.after)
+        self.board_changed = False  # the board changed since the last frame (not only the mouse position)
+        self.last_frame = 0.0  # time.perf_counter() at the start of the last frame
+        self.frame_times = collections.deque(maxlen=FRAME_HISTORY)  # duration of the last frames in seconds
+        self.stats = None
+        self.show_stats = show_stats
+        if stats_file or show_stats:  # replace the handlers by timed versions before they are bound to the widgets
+            self.stats = InteractionStats()
+            for handler_name in INSTRUMENTED_HANDLERS:
+                setattr(self, handler_name, self.stats.wrap_handler(handler_name, getattr(self, handler_name)))
+            self.update_errors = self.stats.wrap_update_errors(self.update_errors)
         self._game = game
         self._tiling_size = self._game.get_tiling_size()  # size of board
         self.init_grid()
@@ -127,6 +234,15 @@ class TantrixGUI:
         print_puzzle_button = tk.Button(button_frame, text="Print Puzzle", command=self.print_current_board)
         print_puzzle_button.pack(side="left", padx=5)  # Same horizontal positioning
 
+        # Button to solve the current puzzle
+        self.solve_button = tk.Button(button_frame, text="Solve", command=self.solve_board)
+        self.solve_button.pack(side="left", padx=5)
+
+        # Button to load a stored solution of the tiles (only with a solution store)
+        if self.load_callback:
+            load_button = tk.Button(button_frame, text="Load Solution", command=self.load_solution)
+            load_button.pack(side="left", padx=5)
+
         # tk.Button(self.root, text="Yellow loop of length 10?", command=self.yellow_loop).pack()
         # tk.Button(self.root, text="Red loop of length 10?", command=self.red_loop).pack()
         # tk.Button(self.root, text="Blue loop of length 10?", command=self.blue_loop).pack()
@@ -140,11 +256,18 @@ class TantrixGUI:
         self.canvas.bind("<ButtonRelease-1>", self.click)
         self.canvas.bind("<B1-Motion>", self.drag)
         self.canvas.bind("<ButtonRelease-3>", self.right_click)
+        self.canvas.bind("<Control-z>", lambda event: self.undo())
+        self.canvas.bind("<Control-y>", lambda event: self.redo())
+        if self.stats:
+            self.canvas.bind("<KeyPress-o>", lambda event: self.toggle_stats())
 
         self.draw()  # draw everything after initialization is finished
 
         self.root.mainloop()
 
+        if stats_file:
+            self.stats.dump(stats_file)
+
     def init_grid(self):
         """
         Precompute triangular grid for use in GUI
@@ -154,29 +277,50 @@ class TantrixGUI:
                         [EDGE_LENGTH, (self._tiling_size + 0.5) * HEX_HEIGHT],
                         [EDGE_LENGTH + (3 * self._tiling_size * EDGE_LENGTH // 2),
                          0.5 * (self._tiling_size + 1) * HEX_HEIGHT]]
+        # edges from the first corner to the other corners and their determinant, used for picking cells
+        edge_k = [self.corners[1][dim] - self.corners[0][dim] for dim in range(2)]
+        edge_l = [self.corners[2][dim] - self.corners[0][dim] for dim in range(2)]
+        self.corner_edges = (edge_k, edge_l, edge_k[0] * edge_l[1] - edge_k[1] * edge_l[0])
 
         self.grid_centers = {}
         for index_i in range(self._tiling_size + 1):
             for index_j in range(self._tiling_size + 1 - index_i):
                 grid_index = (index_i, index_j, self._tiling_size - (index_i + index_j))
-                grid_center = [0, 0]
-                for idx in range(3):
-                    grid_center[0] += self.corners[idx][0] * float(grid_index[idx]) // self._tiling_size
-                    grid_center[1] += self.corners[idx][1] * float(grid_index[idx]) // self._tiling_size
-                self.grid_centers[grid_index] = grid_center
+                self.grid_centers[grid_index] = self.get_grid_center(grid_index)
+        self.full_redraw = True
 
-    def closest_grid_center(self, pos):
+    def get_grid_center(self, grid_index):
         """
-        Compute index for cell that contains pos
+        Compute the canvas position of the cell with given index from the corners of the triangular grid
         """
-        closest_index = 0
-        min_distance = float('inf')
-        for grid_index in self.grid_centers.keys():  # loop over all centers
-            grid_center = self.grid_centers[grid_index]
-            current_distance = dist(pos, grid_center)
-            if current_distance < min_distance:
-                min_distance = current_distance
-                closest_index = grid_index
+        grid_center = [0, 0]
+        for idx in range(3):
+            grid_center[0] += self.corners[idx][0] * float(grid_index[idx]) // self._tiling_size
+            grid_center[1] += self.corners[idx][1] * float(grid_index[idx]) // self._tiling_size
+        return grid_center
+
+    def closest_grid_center(self, pos):
+        """
+        Compute index for cell that contains pos, None if pos is outside the board.
+        The barycentric coordinates of pos in the triangle of the corners, scaled by the tiling size, are the
+        fractional (h, k, l) coordinates, cube rounding gives the hexagon that contains them. The grid centers are
+        rounded to pixels, so the closest center is taken from the rounded cell and its neighbors
+        """
+        rel_x = pos[0] - self.corners[0][0]
+        rel_y = pos[1] - self.corners[0][1]
+        (k_x, k_y), (l_x, l_y), det = self.corner_edges
+        frac_k = self._tiling_size * (rel_x * l_y - rel_y * l_x) / det
+        frac_l = self._tiling_size * (k_x * rel_y - k_y * rel_x) / det
+        fractional = [self._tiling_size - frac_k - frac_l, frac_k, frac_l]
+        rounded = [round(coord) for coord in fractional]
+        # the coordinate with the largest rounding error is recomputed, so that h + k + l = tiling_size
+        diffs = [abs(rounded[idx] - fractional[idx]) for idx in range(3)]
+        largest = diffs.index(max(diffs))
+        rounded[largest] = self._tiling_size - sum(rounded) + rounded[largest]
+        candidates = [tuple(rounded[dim] + step[dim] for dim in range(3)) for step in ((0, 0, 0),) + GRID_STEPS]
+        closest_index = min(candidates, key=lambda grid_index: dist(pos, self.get_grid_center(grid_index)))
+        if min(closest_index) < 0:  # hexagon outside the triangular grid
+            return None
         return closest_index
 
     def check_legal(self):
@@ -194,10 +338,10 @@ class TantrixGUI:
         """
         if not self._game.is_legal():
             print("Configuration is illegal")
-        elif self._game.has_loop("Y"):
-            print("Configuration has a yellow loop of length 10")
+        elif self._game.has_loop("Y", self._game.get_puzzle_size()):
+            print(f"Configuration has a yellow loop of length {self._game.get_puzzle_size()}")
         else:
-            print("Configuration does not have a yellow loop of length 10")
+            print(f"Configuration does not have a yellow loop of length {self._game.get_puzzle_size()}")
 
     def red_loop(self):
         """
@@ -205,10 +349,10 @@ class TantrixGUI:
         """
         if not self._game.is_legal():
             print("Configuration is illegal")
-        elif self._game.has_loop("R"):
-            print("Configuration has a red loop of length 10")
+        elif self._game.has_loop("R", self._game.get_puzzle_size()):
+            print(f"Configuration has a red loop of length {self._game.get_puzzle_size()}")
         else:
-            print("Configuration does not have a red loop of length 10")
+            print(f"Configuration does not have a red loop of length {self._game.get_puzzle_size()}")
 
     def blue_loop(self):
         """
@@ -216,22 +360,80 @@ class TantrixGUI:
         """
         if not self._game.is_legal():
             print("Configuration is illegal")
-        elif self._game.has_loop("B"):
-            print("Configuration has a blue loop of length 10")
+        elif self._game.has_loop("B", self._game.get_puzzle_size()):
+            print(f"Configuration has a blue loop of length {self._game.get_puzzle_size()}")
         else:
-            print("Configuration does not have a blue loop of length 10")
+            print(f"Configuration does not have a blue loop of length {self._game.get_puzzle_size()}")
 
     def shuffle_board(self):
         """
         Shuffle all tiles on the board
         """
+        if self.solver is not None:  # the board is locked while the solver runs
+            return
         self._game.shuffle_tiles()
-        self.draw()
+        self.request_draw()
+
+    def solve_board(self):
+        """
+        Solve the current puzzle with the solver passed from start_game.
+        The callback returns a generator (see annealing.iter_anneal_board) that is advanced one chunk at a time from
+        the event loop, so that the window stays responsive. The board is changed when the generator is exhausted,
+        its return value is the number of errors. The solve button is disabled and the board locked in the meantime
+        """
+        if not self.solve_callback or self.solver is not None or self._mouse_drag:
+            return
+        self.solver = self.solve_callback(self._game)
+        self.solve_button.config(state="disabled")
+        self.root.after(0, self.continue_solving)
+
+    def continue_solving(self):
+        """
+        Run the next chunk of the solver, schedule the following one or show the result after the last one
+        """
+        try:
+            next(self.solver)
+        except StopIteration as stop:
+            self.solver = None
+            self.solve_button.config(state="normal")
+            self._game.record_board()  # the solver changes the board directly, keep the solution undoable
+            print(f"Solver finished with {stop.value} errors")
+            self.request_draw()
+            return
+        self.root.after(1, self.continue_solving)  # leave a gap for the events in between
+
+    def load_solution(self):
+        """
+        Replace the board by a stored solution of its tiles (see solution_store)
+        """
+        if self._mouse_drag or self.solver is not None:
+            return
+        if self.load_callback(self._game):
+            self._game.record_board()  # loading a solution can be undone
+            self.request_draw()
+        else:
+            print("No stored solution for these tiles")
+
+    def undo(self):
+        """
+        Undo the last move (Ctrl+Z), ignored while a tile is dragged or the solver runs
+        """
+        if not self._mouse_drag and self.solver is None and self._game.undo():
+            self.request_draw()
+
+    def redo(self):
+        """
+        Redo the last undone move (Ctrl+Y), ignored while a tile is dragged or the solver runs
+        """
+        if not self._mouse_drag and self.solver is None and self._game.redo():
+            self.request_draw()
 
     def click(self, event):
         """
         Mouse click handler, integrated with dragging, fires on mouse up
         """
+        if self.solver is not None:  # the board is locked while the solver runs
+            return
         # print("recognizing click-event")
         self.canvas.focus_set()  # Ensures canvas keeps focus for keypress events
         pos = (event.x, event.y)
@@ -242,21 +444,23 @@ class TantrixGUI:
         # print(self._game.tile_exists(up_click_index))
         if self._mouse_drag and self.current_tile_code:  # replace the tile with the one selected before (drag'n'drop)
             # print("dragging")
-            if self._game.tile_exists(up_click_index):  # if tile on mouse release location exists
-                # place release location tile on click location tile
-                self._game.place_tile(self.down_click_index, self._game.get_code(up_click_index))
-                # place the selected tile on the up_click_index either way, if tile is empty, moving the tile
-            self._game.place_tile(up_click_index, self.current_tile_code)
-        elif self._game.tile_exists(up_click_index) and not self._mouse_drag:  # rotate the selected tile
+            # put the tile back, then move it as one step of the history (swapping with a tile on the release location)
+            self._game.place_tile(self.down_click_index, self.current_tile_code)
+            if up_click_index is not None and up_click_index != self.down_click_index:
+                self._game.move_tile(self.down_click_index, up_click_index)
+        elif up_click_index is not None and self._game.tile_exists(up_click_index) and not self._mouse_drag:
+            # rotate the selected tile
             # print("rotating...")
             self._game.rotate_tile(up_click_index)
-        self._mouse_drag = False
-        self.draw()
+        self._mouse_drag = False  # the floating tile is removed by the next frame
+        self.request_draw()
 
     def drag(self, event):
         """
         Mouse drag handler, fires on mouse down
         """
+        if self.solver is not None:  # the board is locked while the solver runs
+            return
         # print("recognizing drag-event")
         self.canvas.focus_set()  # Ensures canvas keeps focus for keypress events
         pos = (event.x, event.y)
@@ -264,26 +468,34 @@ class TantrixGUI:
         if not self._mouse_drag:
             self.down_click_index = self.closest_grid_center(pos)
             # print(self.down_click_index)
-            if self._game.tile_exists(self.down_click_index):
+            if self.down_click_index is not None and self._game.tile_exists(self.down_click_index):
                 self.current_tile_code = self._game.remove_tile(self.down_click_index)  # pop the tile
             else:
                 self.current_tile_code = None  # miss the current grab
             # print(self.current_tile_code)
-        self._mouse_drag = True  # indicates a drag operation is happening
+            self._mouse_drag = True  # indicates a drag operation is happening
+            self.mouse_position = pos
+            self.request_draw()
+            return
         self.mouse_position = pos
-        self.draw()
+        if self.current_tile_code:  # only the floating tile has to follow the cursor, the board is unchanged
+            self.request_draw(board_changed=False)
 
     def right_click(self, event):
         """
         Handles right-click, rotating the selected piece counter-clockwise
         """
+        if self.solver is not None:  # the board is locked while the solver runs
+            return
         pos = (event.x, event.y)
         # print(pos)
         right_up_click_index = self.closest_grid_center(pos)
+        if right_up_click_index is None:  # click outside the board
+            return
         if self._game.tile_exists(right_up_click_index) and not self._mouse_drag:  # rotate the selected tile
             # print("rotating...")
             self._game.rotate_tile_counterclock(right_up_click_index)
-        self.draw()
+        self.request_draw()
 
         # print("test")
         # if self.down_click_index and self._game.tile_exists(
@@ -296,137 +508,104 @@ class TantrixGUI:
         """
         Keys to move around arrangement on the board, key decides the shifting direction
         """
+        if self.solver is not None:  # the board is locked while the solver runs
+            return
         self._game.try_board_shift(direction)
-        self.draw()
+        self.request_draw()
         # print(f"Key {direction} was pressed")
 
-    def draw_hexagon(self, center):  # for the empty tiles
+    def request_draw(self, board_changed=True):
+        """
+        Mark the view as outdated and schedule one redraw, requests before the scheduled frame are collected into it.
+        Without board_changed, only the floating drag tile is moved in the next frame
+        """
+        self.board_changed = self.board_changed or board_changed
+        if self.pending_frame is None:
+            delay = self.frame_interval - (time.perf_counter() - self.last_frame)
+            self.pending_frame = self.root.after(max(0, int(1000 * delay)), self.render_frame)
+
+    def render_frame(self):
         """
-        Draw non-fill hexagon on the canvas with given center
+        Redraw the view for all requests since the last frame and record the time spent
+        """
+        self.pending_frame = None
+        if self.stats:
+            self.stats.start_frame()
+        self.last_frame = time.perf_counter()
+        if self.board_changed:
+            self.board_changed = False
+            self.draw()
+        else:
+            self.draw_drag_tile()
+        self.frame_times.append(time.perf_counter() - self.last_frame)
+        if self.stats:
+            self.stats.end_frame(self.frame_times[-1], len(self.canvas.find_all()))
+            if self.show_stats:
+                self.draw_stats()
+
+    def draw_stats(self):
+        """
+        Draw the overlay with the interaction statistics in the top left corner of the canvas
+        """
+        self.canvas.delete(STATS_TAG)
+        self.canvas.create_text(5, 5, text="\n".join(self.stats.summary_lines()), anchor="nw", font=("Courier", 8),
+                                fill="gray25", tags=STATS_TAG)
+
+    def toggle_stats(self):
+        """
+        Show or hide the overlay with the interaction statistics
+        """
+        self.show_stats = not self.show_stats
+        if self.show_stats:
+            self.draw_stats()
+        else:
+            self.canvas.delete(STATS_TAG)
+
+    def draw_drag_tile(self):
+        """
+        Draw the tile that is dragged at the mouse position as one floating item group, move it if it exists already
+        """
+        if self._mouse_drag and self.current_tile_code:
+            if self.drag_position is None:
+                self.draw_tile(self.mouse_position, self.current_tile_code, DRAG_TAG)
+            else:
+                self.canvas.move(DRAG_TAG, self.mouse_position[0] - self.drag_position[0],
+                                 self.mouse_position[1] - self.drag_position[1])
+            self.drag_position = self.mouse_position
+        elif self.drag_position is not None:  # drag and drop has finished
+            self.canvas.delete(DRAG_TAG)
+            self.drag_position = None
+
+    def draw_hexagon(self, center, tag=()):  # for the empty tiles
+        """
+        Draw non-fill hexagon on the canvas with given center, the items get the given tag
         """
         hexagon = make_hexagon(center)
         # Drawing hexagon with lines in Tkinter
-        self.canvas.create_polygon([coord for pair in hexagon for coord in pair], outline="black", fill="white")
+        self.canvas.create_polygon([coord for pair in hexagon for coord in pair], outline="black", fill="white",
+                                   tags=tag)
 
-    def draw_tile(self, center, code):
+    def draw_tile(self, center, code, tag=()):
         """
-        Draw a tile based on its center and code using Tkinter's Canvas.
+        Draw a tile based on its center and code using Tkinter's Canvas, from the cached item template of the code,
+        the items get the given tag
         """
-        # Create the hexagon
-        hexagon = make_hexagon(center)
-        # Draw the hexagon
-        self.canvas.create_polygon([coord for pair in hexagon for coord in pair], outline="white", width=2,
-                                   fill="black")
-
-        # Midpoints between each pair of adjacent hexagon points
-        mid_pts = [[0.5 * (hexagon[idx][dim] + hexagon[idx + 1][dim]) for dim in range(2)]  # hexagon contains vertices
-                   for idx in range(len(hexagon) - 1)]
-
-        for color in COLOR_DICT.keys():  # cycle through every color on the tiles
-            first = code.find(color)  # find the distance between the two occurrences of the color
-            second = code.rfind(color)  # search from the right side
-            arc = (second - first) % 6  # arc in [1, 2, 3, 4, 5]
-
-            if arc == 3:  # if 3, the color-matching edges are on the hexagons opposing edges
-                # Straight line across the tile
-                # (start_points, end_points, thickness, color)
-                self.canvas.create_line(mid_pts[first][0], mid_pts[first][1],  # first and second color occurrence
-                                        mid_pts[second][0], mid_pts[second][1],
-                                        width=EDGE_LENGTH / 4, fill=COLOR_DICT[color])
-            elif arc == 2 or arc == 4:  # center point is the center of the neighbor tile between the 2 matching edges
-                # Long arc across the tile
-                src = second if arc == 4 else first
-                src = (src + 2) % 6
-                start_ang = 120 + 60 * src
-                offset_ang = (start_ang + 180) * math.pi / 180
-
-                cp = [hexagon[src][0] + EDGE_LENGTH * math.cos(offset_ang),  # center point
-                      hexagon[src][1] + EDGE_LENGTH * math.sin(offset_ang)]  # starting from vertex of hexagon
-
-                rad = EDGE_LENGTH * 1.5
-                pline = []
-                for i in range(7):  # 13, 5
-                    ang = (start_ang + 10 * i) * math.pi / 180
-                    pt = [cp[0] + rad * math.cos(ang), cp[1] + rad * math.sin(ang)]
-                    pline.append(pt)
-
-                # Draw the arc as a sequence of lines
-                # for i in range(len(pline) - 1):
-                #     self.canvas.create_line(pline[i][0], pline[i][1], pline[i + 1][0], pline[i + 1][1],
-                #                             width=EDGE_LENGTH / 7, fill=COLOR_DICT[color])
-
-                # Set the starting and ending angle depending on the edge of the hexagon
-                if src == 3:
-                    start_angle, end_angle = 0, 60
-                elif src == 2:
-                    start_angle, end_angle = 60, 120
-                elif src == 1:
-                    start_angle, end_angle = 120, 180
-                elif src == 0:
-                    start_angle, end_angle = 180, 240
-                elif src == 5:
-                    start_angle, end_angle = 240, 300
-                else:
-                    start_angle, end_angle = 300, 360
-
-                start_angle = start_angle + 1  # minor adjustments
-                end_angle = end_angle - 1
-
-                # start_angle = (180 - src * 60) % 360
-                # end_angle = (start_ang + 60) % 360
-
-                self.canvas.create_circle_arc(x=cp[0], y=cp[1], r=rad, style="arc", outline=COLOR_DICT[color],
-                                              width=EDGE_LENGTH / 4, start=start_angle, end=end_angle)
-                # self.canvas.create_circle_arc(x=cp[0], y=cp[1], r=rad, style="arc", outline="pink",
-                #                               width=EDGE_LENGTH / 7, start=end_angle-5, end=end_angle)
-
-            elif arc == 1 or arc == 5:
-                # Short arc between adjacent edges
-                # 120 degree arc, centered around shared corner
-                src = second if arc == 5 else first
-                src = (src + 1) % 6
-                cp = hexagon[src]  # center point of the ard
-                start_ang = 120 + 60 * src
-                rad = EDGE_LENGTH / 2
-                pline = []
-                for i in range(5):  # 9, 15
-                    ang = (start_ang + 30 * i) * math.pi / 180
-                    pt = [cp[0] + rad * math.cos(ang), cp[1] + rad * math.sin(ang)]  # polar coordinates
-                    pline.append(pt)
-
-                # Draw the arc as a sequence of lines
-                # for i in range(len(pline) - 1):
-                #     self.canvas.create_line(pline[i][0], pline[i][1], pline[i + 1][0], pline[i + 1][1],
-                #                             width=EDGE_LENGTH / 7, fill=COLOR_DICT[color])
-
-                # Set the starting and ending angle depending on the edge of the hexagon
-                if src == 2:
-                    start_angle, end_angle = 0, 120
-                elif src == 1:
-                    start_angle, end_angle = 60, 180
-                elif src == 0:
-                    start_angle, end_angle = 120, 240
-                elif src == 5:
-                    start_angle, end_angle = 180, 300
-                elif src == 4:
-                    start_angle, end_angle = 240, 360
-                else:
-                    start_angle, end_angle = 300, 420
-
-                start_angle = start_angle + 2
-                end_angle = end_angle - 2
-
-                self.canvas.create_circle_arc(x=cp[0], y=cp[1], r=rad, style="arc", outline=COLOR_DICT[color],
-                                              width=EDGE_LENGTH / 4, start=start_angle, end=end_angle)
-                # self.canvas.create_circle_arc(x=cp[0], y=cp[1], r=rad, style="arc", outline="pink",
-                #                               width=EDGE_LENGTH / 7, start=end_angle-5, end=end_angle)
+        for item_type, coords, options in get_tile_template(code, EDGE_LENGTH):
+            # Shift the template coordinates (x, y, x, y, ...) from the origin to the center of the tile
+            shifted_coords = [coord + center[idx % 2] for idx, coord in enumerate(coords)]
+            if item_type == "polygon":
+                self.canvas.create_polygon(shifted_coords, tags=tag, **options)
+            elif item_type == "line":
+                self.canvas.create_line(*shifted_coords, tags=tag, **options)
+            else:
+                self.canvas.create_arc(*shifted_coords, tags=tag, **options)
 
     def update_errors(self):
         """
         Update the error counter
         """
-        # Call is_legal function from game object
-        _, mismatches = self._game.is_legal(count_errors=1)
+        # Read the mismatch counter that the game object keeps up to date
+        mismatches = self._game.get_mismatches()
         # Update label text and color based on mismatches
         if mismatches == 0:
             self.error_label.config(text=f"Errors: {mismatches}", fg="green")
@@ -461,7 +640,7 @@ class TantrixGUI:
         instructions_window = tk.Toplevel(self.root)
         instructions_window.title("Game Instructions")
         # Set the size of the pop-up window
-        instructions_window.geometry("300x420")
+        instructions_window.geometry("300x580")
         # Add a label with instructions text
         instruction_label = tk.Label(instructions_window,
                                      text="How to Play:\n\n1. Match colors on adjacent tiles.\n"
@@ -484,7 +663,14 @@ class TantrixGUI:
                                           "move tile arrangement up/down, \n"
                                           "(top-/bottom-) left/right. \n"
                                           "10. Use \"Print Puzzle\" to print current \n"
-                                          "board to console.",
+                                          "board to console. \n"
+                                          "11. Use \"Solve\" to let the simulated \n"
+                                          "annealing solver arrange the tiles. \n"
+                                          "12. Press 'o' to show/hide the timing \n"
+                                          "statistics (start with --show-stats). \n"
+                                          "13. Use Ctrl+Z / Ctrl+Y to undo/redo moves. \n"
+                                          "14. Use \"Load Solution\" to load a stored \n"
+                                          "solution of the tiles (start with --store).",
                                      justify="left")
         instruction_label.pack(pady=10)
         # Add a button to close the pop-up window
@@ -495,13 +681,17 @@ class TantrixGUI:
         """
         Move all the tiles into the right corner and arrange them into a pyramid
         """
+        if self.solver is not None:  # the board is locked while the solver runs
+            return
         self._game.move_to_pyramid()
-        self.draw()
+        self.request_draw()
 
     def make_new_puzzle(self):
         """
         Read user input for tile size, call game function to create a new puzzle
         """
+        if self.solver is not None:  # the board is locked while the solver runs
+            return
         try:
             new_puzzle_size = int(self.puzzle_size_entry.get())  # Get value from entry and convert to integer
         except ValueError:
@@ -510,7 +700,7 @@ class TantrixGUI:
         self._game.new_tiles(num_tiles=new_puzzle_size, three_colors=self.use_three_colors.get())
         self.init_grid()  # recalculate grid after puzzle_size has been changed (update tiling_size in game-file)
         # print(f"{self.grid_centers.keys()=}")
-        self.draw()
+        self.request_draw()
         self.resize_window()
 
     def resize_window(self):
@@ -525,19 +715,31 @@ class TantrixGUI:
 
     def draw(self):
         """
-        Draw everything
+        Draw everything that changed since the last call, the items of every cell are tagged with get_cell_tag and
+        only recreated if the code on the cell differs from the drawn one
         """
-        self.canvas.delete("all")  # Clear the canvas before redrawing
+        if self.full_redraw:  # new grid, clear the canvas before redrawing
+            self.canvas.delete("all")
+            self.drawn_codes = {}
+            self.drag_position = None
+            self.full_redraw = False
+        tile_value = self._game.get_tile_value()
         # print(f"{self.grid_centers.keys()=}")
         for grid_index in self.grid_centers.keys():
+            code = tile_value.get(grid_index)
+            if grid_index in self.drawn_codes and self.drawn_codes[grid_index] == code:
+                continue  # cell is unchanged
+            tag = get_cell_tag(grid_index)
+            self.canvas.delete(tag)
             grid_center = self.grid_centers[grid_index]  # grid centers where hexagons will be drawn
-            if self._game.tile_exists(grid_index):
-                self.draw_tile(grid_center, self._game.get_code(grid_index))  # field with tile on it
+            if code is not None:
+                self.draw_tile(grid_center, code, tag)  # field with tile on it
             else:
-                self.draw_hexagon(grid_center)  # empty field (no tile)
-
-        if self._mouse_drag and self.current_tile_code:  # when dnd draw selected tile at cursor position
-            self.draw_tile(self.mouse_position, self.current_tile_code)
+                self.draw_hexagon(grid_center, tag)  # empty field (no tile)
+            self.drawn_codes[grid_index] = code
 
+        self.draw_drag_tile()
+        if self.drag_position is not None:
+            self.canvas.tag_raise(DRAG_TAG)  # keep the dragged tile above redrawn cells
         self.update_errors()
         self.update_tile_entry()
@@ -0,0 +1,64 @@
+"""
+Tile codes and directions of the Tantrix Solo game
+
+Plain Python tables without further dependencies, shared by the game, the GUI and the command line tools
+"""
+
+# Core modeling idea - a triangular grid of hexagonal tiles are
+# modeled by integer tuples of the form (h, k, l)
+# where h + k + l == size and h, k, l >= 0.
+
+# Each hexagon has a neighbor in one of six directions
+# These directions are modeled by the differences between the 
+# tuples of these adjacent tiles
+
+# Numbered directions for hexagonal grid, ordered clockwise at 60 degree intervals, dictionary,
+# starting with bottom right edge (hexagon orientated with "flat" side down)
+DIRECTIONS = {0: (-1, 0, 1), 1: (-1, 1, 0), 2: (0, 1, -1),
+              3: (1, 0, -1), 4: (1, -1, 0), 5: (0, -1, 1)}
+
+
+def reverse_direction(direction):
+    """
+    Helper function that returns the opposite direction on a hexagonal grid
+    """
+    num_directions = len(DIRECTIONS)
+    return (direction + num_directions // 2) % num_directions
+
+
+# Color codes for ten tiles in Tantrix Solitaire
+# "B" denotes "Blue", "R" denotes "Red", "Y" denotes "Yellow", "G" denotes "Green"
+# Tile coded starting from bottom right edge clockwise
+# CODES = ["BBRRYY", "BBRYYR", "BBYRRY", "BRYBYR", "RBYRYB",
+#                    "YBRYRB", "BBRYRY", "BBYRYR", "YYBRBR", "YYRBRB"]
+CODES = ['BBRYRY', 'BYRBRY', 'RBYYRB', 'BBYRRY', 'RBRYYB', 'YBYRRB', 'BBYRYR',
+         'BBRRYY', 'YBRYRB', 'BBRYYR', 'RBYRYB', 'YYBRRB', 'BBYYRR', 'YBRRYB',
+         'RYGGRY', 'GYRGRY', 'YYRGRG', 'RRYGGY', 'YYGRGR', 'GYRRGY', 'RYRGGY',
+         'YYGGRR', 'YRGYGR', 'YYRGGR', 'RYGRGY', 'YYGRRG', 'YYRRGG', 'GYGRRY',
+         'BBRGRG', 'BRGBGR', 'RBGGRB', 'BBGRRG', 'RBRGGB', 'GBGRRB', 'BBGRGR',
+         'BBRRGG', 'GBRGRB', 'BBRGGR', 'RBGRGB', 'RRBGGB', 'BBGGRR', 'GBRRGB',
+         'BBGYGY', 'BYGBGY', 'GBYYGB', 'BBYGGY', 'GBGYYB', 'YBYGGB', 'BBYGYG',
+         'BBGGYY', 'YBGYGB', 'BBGYYG', 'GBYGYB', 'YYBGGB', 'BBYYGG', 'YBGGYB']
+
+# Integer ids of the edge colors, used by the array backed board
+COLOR_IDS = {"B": 1, "R": 2, "Y": 3, "G": 4}
+# Every tile code in all six rotations, rotation r is the code rotated clockwise r times (see Tantrix.rotate_tile)
+ROTATED_CODES = [[code[len(code) - rotation:] + code[:len(code) - rotation] for rotation in range(6)] for code in CODES]
+# Map every rotated code back to its (tile id, rotation)
+CODE_INDEX = {rotated_code: (tile, rotation) for tile, rotations in enumerate(ROTATED_CODES)
+              for rotation, rotated_code in enumerate(rotations)}
+
+
+def encode_board(codes):
+    """
+    Return the tile ids and the rotations of a sequence of tile codes, ([tiles], [rotations])
+    """
+    pairs = [CODE_INDEX[code] for code in codes]
+    return [tile for tile, _ in pairs], [rotation for _, rotation in pairs]
+
+
+def decode_board(tiles, rotations):
+    """
+    Return the tile codes of sequences of tile ids and rotations, the inverse of encode_board
+    """
+    return [ROTATED_CODES[tile][rotation] for tile, rotation in zip(tiles, rotations)]
@@ -0,0 +1,380 @@
+"""
+Simulated annealing solver for Tantrix puzzles
+
+A puzzle is modeled as a list of cells with a neighbor table in the order of the GUI DIRECTIONS
+(see solo_tantrix.batch_mismatches), every cell holds a tile id and a rotation or no tile at all.
+The energy of a configuration is the number of mismatching edges. Every move (rotate a tile, swap two tiles,
+move a tile onto an empty cell) is scored by recomputing only the edges of the touched cells, swapped or moved tiles
+are turned into their best fitting rotation before the move is scored.
+"""
+import math
+import multiprocessing
+import random
+
+from GUI.solo_tantrix import DIRECTIONS, EDGE_COLORS, reverse_direction
+from start_game import get_puzzle_neighbors, split_puzzle
+
+# Default parameters of the cooling schedule
+STEPS = 200000
+START_TEMPERATURE = 1.0
+END_TEMPERATURE = 0.05
+# Steps between two pauses of Annealer.iter_run (a few milliseconds), so that the GUI stays responsive while solving
+CHUNK_STEPS = 2000
+# Probability of proposing a rotation instead of a swap/move
+ROTATION_PROBABILITY = 0.5
+# Default parameters of the parallel solvers, the number of replicas defaults to the number of cores
+ROUNDS = 200
+EXCHANGE_STEPS = 5000
+MIN_TEMPERATURE = 0.1
+MAX_TEMPERATURE = 1.5
+RESTARTS = 32
+
+# Nested lists are faster than NumPy arrays for single lookups
+EDGE_COLOR_LIST = EDGE_COLORS.tolist()
+REVERSED_DIRECTIONS = [reverse_direction(direction) for direction in DIRECTIONS]
+
+
+class Annealer:
+    """
+    Simulated annealing on a set of cells with O(1) delta evaluation of every move
+    """
+
+    def __init__(self, tiles, rotations, neighbors, seed=None):
+        """
+        :param tiles: tile id per cell, None for an empty cell
+        :param rotations: rotation per cell (ignored for empty cells)
+        :param neighbors: neighbor table of shape (cells, 6) in DIRECTIONS order, -1 for missing neighbors
+        :param seed: seed of the random number generator
+        """
+        self._tiles = list(tiles)
+        self._rotations = [rotation % 6 for rotation in rotations]
+        self._neighbors = [list(row) for row in (neighbors.tolist() if hasattr(neighbors, "tolist") else neighbors)]
+        self._random = random.Random(seed)
+        # Occupied cells as list for random picks, with the position of every cell in that list for O(1) updates
+        self._occupied = [cell for cell, tile in enumerate(self._tiles) if tile is not None]
+        self._slot = {cell: idx for idx, cell in enumerate(self._occupied)}
+        self._energy = sum(self.cell_mismatches(cell) for cell in self._occupied) // 2
+        self._best_energy = self._energy
+        self._best = (self._tiles[:], self._rotations[:])
+
+    def get_energy(self):
+        """Return the number of mismatching edges of the current configuration"""
+        return self._energy
+
+    def get_best_energy(self):
+        """Return the lowest number of mismatching edges found so far"""
+        return self._best_energy
+
+    def get_state(self):
+        """Return tile ids and rotations of the current configuration"""
+        return self._tiles[:], self._rotations[:]
+
+    def get_best(self):
+        """Return tile ids and rotations of the best configuration found so far"""
+        return self._best[0][:], self._best[1][:]
+
+    def set_state(self, tiles, rotations):
+        """Replace the current configuration (the cells and their neighbors stay the same)"""
+        self._tiles = list(tiles)
+        self._rotations = [rotation % 6 for rotation in rotations]
+        self._occupied = [cell for cell, tile in enumerate(self._tiles) if tile is not None]
+        self._slot = {cell: idx for idx, cell in enumerate(self._occupied)}
+        self._energy = sum(self.cell_mismatches(cell) for cell in self._occupied) // 2
+        self._update_best()
+
+    def cell_mismatches(self, cell):
+        """Return the number of mismatching edges of the tile on the given cell"""
+        tile = self._tiles[cell]
+        if tile is None:
+            return 0
+        colors = EDGE_COLOR_LIST[tile][self._rotations[cell]]
+        mismatches = 0
+        for direction, neighbor in enumerate(self._neighbors[cell]):
+            if neighbor >= 0:
+                neighbor_tile = self._tiles[neighbor]
+                if neighbor_tile is not None and colors[direction] != \
+                        EDGE_COLOR_LIST[neighbor_tile][self._rotations[neighbor]][REVERSED_DIRECTIONS[direction]]:
+                    mismatches += 1
+        return mismatches
+
+    def _pair_mismatches(self, cell_a, cell_b):
+        """Mismatching edges touching cell_a or cell_b, the shared edge of neighboring cells counts once"""
+        mismatches = self.cell_mismatches(cell_a) + self.cell_mismatches(cell_b)
+        neighbors_a = self._neighbors[cell_a]
+        if cell_b in neighbors_a and self._tiles[cell_a] is not None and self._tiles[cell_b] is not None:
+            direction = neighbors_a.index(cell_b)
+            if EDGE_COLOR_LIST[self._tiles[cell_a]][self._rotations[cell_a]][direction] != \
+                    EDGE_COLOR_LIST[self._tiles[cell_b]][self._rotations[cell_b]][REVERSED_DIRECTIONS[direction]]:
+                mismatches -= 1
+        return mismatches
+
+    def _swap(self, cell_a, cell_b):
+        """Swap the contents of two cells, one of them may be empty"""
+        self._tiles[cell_a], self._tiles[cell_b] = self._tiles[cell_b], self._tiles[cell_a]
+        self._rotations[cell_a], self._rotations[cell_b] = self._rotations[cell_b], self._rotations[cell_a]
+        if self._tiles[cell_a] is None:  # tile moved from cell_a onto the empty cell_b
+            self._slot[cell_b] = self._slot.pop(cell_a)
+            self._occupied[self._slot[cell_b]] = cell_b
+        elif self._tiles[cell_b] is None:  # tile moved from cell_b onto the empty cell_a
+            self._slot[cell_a] = self._slot.pop(cell_b)
+            self._occupied[self._slot[cell_a]] = cell_a
+
+    def _align(self, cell):
+        """Turn the tile on the given cell into the rotation with the fewest mismatches to its neighbors"""
+        if self._tiles[cell] is None:
+            return
+        best_rotation, best_mismatches = self._rotations[cell], 7
+        for rotation in range(6):
+            self._rotations[cell] = rotation
+            mismatches = self.cell_mismatches(cell)
+            if mismatches < best_mismatches:
+                best_rotation, best_mismatches = rotation, mismatches
+        self._rotations[cell] = best_rotation
+
+    def _accept(self, delta, temperature):
+        """Metropolis criterion"""
+        return delta <= 0 or self._random.random() < math.exp(-delta / temperature)
+
+    def _update_best(self):
+        """Remember the current configuration if it is the best so far"""
+        if self._energy < self._best_energy:
+            self._best_energy = self._energy
+            self._best = (self._tiles[:], self._rotations[:])
+
+    def step(self, temperature):
+        """Propose one random move and accept or reject it at the given temperature"""
+        cell_a = self._random.choice(self._occupied)
+        if len(self._tiles) == 1 or self._random.random() < ROTATION_PROBABILITY:  # rotate a tile
+            before = self.cell_mismatches(cell_a)
+            old_rotation = self._rotations[cell_a]
+            self._rotations[cell_a] = (old_rotation + self._random.randint(1, 5)) % 6
+            delta = self.cell_mismatches(cell_a) - before
+            if not self._accept(delta, temperature):
+                self._rotations[cell_a] = old_rotation
+                return
+        else:  # swap two tiles or move a tile onto an empty cell
+            cell_b = self._random.randrange(len(self._tiles) - 1)
+            if cell_b >= cell_a:
+                cell_b += 1
+            before = self._pair_mismatches(cell_a, cell_b)
+            old_rotations = self._rotations[cell_a], self._rotations[cell_b]
+            self._swap(cell_a, cell_b)
+            self._align(cell_a)
+            self._align(cell_b)
+            delta = self._pair_mismatches(cell_a, cell_b) - before
+            if not self._accept(delta, temperature):
+                self._swap(cell_a, cell_b)
+                self._rotations[cell_a], self._rotations[cell_b] = old_rotations
+                return
+        self._energy += delta
+        if self._energy < self._best_energy:
+            self._update_best()
+
+    def run(self, steps=STEPS, start_temperature=START_TEMPERATURE, end_temperature=END_TEMPERATURE):
+        """
+        Anneal with a geometric cooling schedule, stop early as soon as all edges match
+        :return: lowest number of mismatching edges found
+        """
+        for _ in self.iter_run(steps, start_temperature, end_temperature, chunk_steps=steps):
+            pass
+        return self._best_energy
+
+    def iter_run(self, steps=STEPS, start_temperature=START_TEMPERATURE, end_temperature=END_TEMPERATURE,
+                 chunk_steps=CHUNK_STEPS):
+        """
+        Same cooling schedule as run, but pause after every chunk_steps steps, so that the search can be interleaved
+        with other work (e.g. the event loop of the GUI)
+        :return: generator of the number of steps done so far
+        """
+        if not self._occupied:
+            return
+        cooling = (end_temperature / start_temperature) ** (1 / max(steps - 1, 1))
+        temperature = start_temperature
+        done = 0
+        while done < steps and self._energy != 0:
+            for _ in range(min(chunk_steps, steps - done)):
+                if self._energy == 0:
+                    break
+                self.step(temperature)
+                temperature *= cooling
+                done += 1
+            yield done
+
+
+def anneal_puzzle(puzzle, steps=STEPS, start_temperature=START_TEMPERATURE, end_temperature=END_TEMPERATURE,
+                  seed=None):
+    """
+    Solve a puzzle in one of the formats read by start_game.parse_sol on its fields
+    :return: [[fields], [tiles], [rotations]] of the best configuration and its number of mismatching edges
+    """
+    fields, tiles, rotations = split_puzzle(puzzle)
+    annealer = Annealer(tiles, rotations, get_puzzle_neighbors(fields), seed=seed)
+    annealer.run(steps, start_temperature, end_temperature)
+    best_tiles, best_rotations = annealer.get_best()
+    return [fields, best_tiles, best_rotations], annealer.get_best_energy()
+
+
+def get_board_cells(game, use_empty_fields=False):
+    """
+    Get the cells of a Tantrix board and their neighbor table for the Annealer
+    :param game: solo_tantrix.Tantrix object
+    :param use_empty_fields: if true, all fields of the grid are cells and tiles may be moved onto empty fields,
+                             otherwise only the fields with tiles (the shape of the arrangement is kept)
+    :return: list of grid indices, tile ids, rotations and the neighbor table
+    """
+    board = game.get_board()
+    if use_empty_fields:
+        cells = game.get_grid_coordinates()
+    else:
+        cells = board.indices()
+    cell_positions = {grid_index: idx for idx, grid_index in enumerate(cells)}
+    neighbors = [[cell_positions.get(game.get_neighbor(grid_index, direction), -1) for direction in DIRECTIONS]
+                 for grid_index in cells]
+    tiles, rotations = [], []
+    for grid_index in cells:
+        tile, rotation = board.get_tile(grid_index) if board.has_tile(grid_index) else (None, 0)
+        tiles.append(tile)
+        rotations.append(rotation)
+    return cells, tiles, rotations, neighbors
+
+
+def anneal_board(game, steps=STEPS, start_temperature=START_TEMPERATURE, end_temperature=END_TEMPERATURE,
+                 use_empty_fields=False, seed=None):
+    """
+    Solve the arrangement on a Tantrix board in place, see get_board_cells for use_empty_fields
+    :return: number of mismatching edges of the best configuration, which is placed onto the board
+    """
+    cells, tiles, rotations, neighbors = get_board_cells(game, use_empty_fields)
+    annealer = Annealer(tiles, rotations, neighbors, seed=seed)
+    annealer.run(steps, start_temperature, end_temperature)
+    return _place_best(game, cells, annealer)
+
+
+def iter_anneal_board(game, steps=STEPS, start_temperature=START_TEMPERATURE, end_temperature=END_TEMPERATURE,
+                      use_empty_fields=False, seed=None, chunk_steps=CHUNK_STEPS):
+    """
+    Generator variant of anneal_board that pauses after every chunk_steps steps (see Annealer.iter_run).
+    The board is left unchanged until the search is finished, then the best configuration is placed onto it
+    :return: generator of the number of steps done so far, its return value is the number of mismatching edges
+    """
+    cells, tiles, rotations, neighbors = get_board_cells(game, use_empty_fields)
+    annealer = Annealer(tiles, rotations, neighbors, seed=seed)
+    yield from annealer.iter_run(steps, start_temperature, end_temperature, chunk_steps)
+    return _place_best(game, cells, annealer)
+
+
+def _place_best(game, cells, annealer):
+    """Replace the board by the best configuration of the annealer on the cells, return its number of mismatches"""
+    best_tiles, best_rotations = annealer.get_best()
+    game.clear_board()
+    for grid_index, tile, rotation in zip(cells, best_tiles, best_rotations):
+        if tile is not None:
+            game.set_tile(grid_index, tile, rotation)
+    return game.get_mismatches()
+
+
+# Neighbor table of the puzzle in the worker processes, set once per process by _init_worker
+_worker_neighbors = None
+
+
+def _init_worker(neighbors):
+    """Store the neighbor table in the worker process, so that it is not sent with every task"""
+    global _worker_neighbors
+    _worker_neighbors = neighbors
+
+
+def _run_replica(task):
+    """Run one replica at constant temperature (parallel tempering) or one full cooling schedule (restarts)"""
+    tiles, rotations, steps, start_temperature, end_temperature, seed = task
+    annealer = Annealer(tiles, rotations, _worker_neighbors, seed=seed)
+    annealer.run(steps, start_temperature, end_temperature)
+    return annealer.get_state(), annealer.get_energy(), annealer.get_best(), annealer.get_best_energy()
+
+
+def parallel_tempering(tiles, rotations, neighbors, replicas=None, rounds=ROUNDS, exchange_steps=EXCHANGE_STEPS,
+                       min_temperature=MIN_TEMPERATURE, max_temperature=MAX_TEMPERATURE, processes=None, seed=None):
+    """
+    Run replicas at a geometric ladder of temperatures in a process pool. After every round of exchange_steps steps
+    neighboring replicas swap their states with the usual tempering criterion and the coldest replica continues from
+    the best board found so far, stop as soon as all edges match
+    :param tiles: tile id per cell, None for an empty cell (see Annealer)
+    :param rotations: rotation per cell
+    :param neighbors: neighbor table of shape (cells, 6) in DIRECTIONS order
+    :param replicas: number of replicas, default is the number of processes
+    :param processes: number of worker processes, default is the number of cores
+    :return: tile ids and rotations of the best configuration and its number of mismatching edges
+    """
+    processes = processes or multiprocessing.cpu_count()
+    replicas = replicas or processes
+    rng = random.Random(seed)
+    if replicas > 1:
+        temperatures = [min_temperature * (max_temperature / min_temperature) ** (idx / (replicas - 1))
+                        for idx in range(replicas)]
+    else:
+        temperatures = [min_temperature]
+    states = [(list(tiles), list(rotations))] * replicas
+    energies = [Annealer(tiles, rotations, neighbors).get_energy()] * replicas
+    best, best_energy = (list(tiles), list(rotations)), energies[0]
+    neighbors = neighbors.tolist() if hasattr(neighbors, "tolist") else neighbors
+    with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(neighbors,)) as pool:
+        for round_idx in range(rounds):
+            if best_energy == 0:
+                break
+            tasks = [(*states[idx], exchange_steps, temperatures[idx], temperatures[idx], rng.getrandbits(64))
+                     for idx in range(replicas)]
+            for idx, (state, energy, replica_best, replica_best_energy) in enumerate(pool.map(_run_replica, tasks)):
+                states[idx], energies[idx] = state, energy
+                if replica_best_energy < best_energy:
+                    best, best_energy = replica_best, replica_best_energy
+            # Exchange the states of neighboring temperatures, alternating between even and odd pairs
+            for idx in range(round_idx % 2, replicas - 1, 2):
+                exponent = (1 / temperatures[idx] - 1 / temperatures[idx + 1]) * (energies[idx] - energies[idx + 1])
+                if exponent >= 0 or rng.random() < math.exp(exponent):
+                    states[idx], states[idx + 1] = states[idx + 1], states[idx]
+                    energies[idx], energies[idx + 1] = energies[idx + 1], energies[idx]
+            if best_energy < energies[0]:  # share the best board with the coldest replica
+                states[0], energies[0] = best, best_energy
+    return best[0], best[1], best_energy
+
+
+def multi_start(tiles, rotations, neighbors, restarts=RESTARTS, steps=STEPS, start_temperature=START_TEMPERATURE,
+                end_temperature=END_TEMPERATURE, processes=None, seed=None):
+    """
+    Run independent annealing chains from the same start in a process pool, stop as soon as one chain solves the
+    puzzle (see parallel_tempering for the parameters)
+    :return: tile ids and rotations of the best configuration and its number of mismatching edges
+    """
+    rng = random.Random(seed)
+    tasks = [(list(tiles), list(rotations), steps, start_temperature, end_temperature, rng.getrandbits(64))
+             for _ in range(restarts)]
+    best, best_energy = (list(tiles), list(rotations)), Annealer(tiles, rotations, neighbors).get_energy()
+    neighbors = neighbors.tolist() if hasattr(neighbors, "tolist") else neighbors
+    with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(neighbors,)) as pool:
+        for _, _, chain_best, chain_best_energy in pool.imap(_run_replica, tasks):
+            if chain_best_energy < best_energy:
+                best, best_energy = chain_best, chain_best_energy
+            if best_energy == 0:
+                break
+    return best[0], best[1], best_energy
+
+
+def parallel_anneal_puzzle(puzzle, mode="tempering", steps=None, processes=None, seed=None, **kwargs):
+    """
+    Solve a puzzle in one of the formats read by start_game.parse_sol on all cores
+    :param mode: "tempering" for parallel_tempering or "restarts" for multi_start
+    :param steps: number of annealing steps of every replica (rounded up to whole rounds of exchange_steps) or of
+                  every restart, None for the defaults of the solver
+    :param kwargs: further parameters of parallel_tempering or multi_start
+    :return: [[fields], [tiles], [rotations]] of the best configuration and its number of mismatching edges
+    """
+    if steps is not None:
+        if mode == "tempering":
+            exchange_steps = kwargs.get("exchange_steps", EXCHANGE_STEPS)
+            kwargs["rounds"] = max(1, -(-steps // exchange_steps))
+        else:
+            kwargs["steps"] = steps
+    fields, tiles, rotations = split_puzzle(puzzle)
+    solver = parallel_tempering if mode == "tempering" else multi_start
+    best_tiles, best_rotations, best_energy = solver(tiles, rotations, get_puzzle_neighbors(fields),
+                                                     processes=processes, seed=seed, **kwargs)
+    return [fields, best_tiles, best_rotations], best_energy
@@ -0,0 +1,110 @@
+"""
+Streaming converter for files with one puzzle per line (JSONL / NDJSON)
+
+Every line holds one puzzle as JSON value, either in one of the formats of start_game.py (see README), as GUI format
+object {"h,k,l": "code", ...} or as string with the Python representation printed by the game ('Print Puzzle').
+The puzzles are read, converted and written one by one, so the memory use does not grow with the file size:
+
+python batch_convert.py puzzles.jsonl --to gui -o gui_puzzles.jsonl
+"""
+import argparse
+import json
+import sys
+import time
+
+from start_game import split_puzzle, transform_gui_puzzle_to_tantrix_format
+from tantrix_cli import is_gui_format, read_puzzle, to_gui_format, validate_puzzle
+
+
+def puzzle_from_json(value):
+    """Read a puzzle from a decoded JSON value, GUI format keys "h,k,l" become grid index tuples"""
+    if isinstance(value, str):
+        return read_puzzle(value)
+    if isinstance(value, dict):
+        return {tuple(int(coord) for coord in key.split(",")): code for key, code in value.items()}
+    return value
+
+
+def puzzle_to_json(puzzle):
+    """Encode a puzzle as one JSON line, the inverse of puzzle_from_json"""
+    if is_gui_format(puzzle):
+        return json.dumps({",".join(str(coord) for coord in grid_index): code for grid_index, code in puzzle.items()})
+    return json.dumps(puzzle)
+
+
+def read_puzzles(lines):
+    """
+    Generate (line number, puzzle) for the non-empty lines, lines that cannot be decoded are returned with the
+    ValueError instead of the puzzle
+    """
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_number, puzzle_from_json(json.loads(line))
+        except ValueError as error:
+            yield line_number, error
+
+
+def convert(puzzle, to_format):
+    """
+    Convert a puzzle to the GUI format (to_format "gui"), to [[fields], [tiles], [rotations]] ("fields") or to the
+    respective other format ("auto")
+    """
+    if to_format == "auto":
+        to_format = "fields" if is_gui_format(puzzle) else "gui"
+    if to_format == "gui":
+        return puzzle if is_gui_format(puzzle) else to_gui_format(puzzle)
+    if is_gui_format(puzzle):
+        return transform_gui_puzzle_to_tantrix_format(puzzle)
+    return list(split_puzzle(puzzle))
+
+
+def convert_puzzles(puzzles, to_format="auto"):
+    """
+    Convert the (line number, puzzle) pairs of read_puzzles, generate (line number, converted puzzle or None, list of
+    problems), invalid puzzles are not converted
+    """
+    for line_number, puzzle in puzzles:
+        if isinstance(puzzle, ValueError):
+            yield line_number, None, [str(puzzle)]
+            continue
+        problems = validate_puzzle(puzzle)
+        yield line_number, None if problems else convert(puzzle, to_format), problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a JSONL file of Tantrix puzzles between the formats.")
+    parser.add_argument("input", help="Input file with one puzzle per line, - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="Output file, - for stdout (default)")
+    parser.add_argument("--to", choices=["auto", "gui", "fields"], default="auto",
+                        help="Target format: GUI format, [[fields], [tiles], [rotations]] or the respective other "
+                             "format of every puzzle (default)")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == "-" else open(args.input)
+    target = sys.stdout if args.output == "-" else open(args.output, "w")
+    converted = failed = 0
+    start_time = time.perf_counter()
+    try:
+        for line_number, puzzle, problems in convert_puzzles(read_puzzles(source), args.to):
+            if problems:
+                failed += 1
+                print(f"line {line_number}: {'; '.join(problems)}", file=sys.stderr)
+                continue
+            target.write(puzzle_to_json(puzzle) + "\n")
+            converted += 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    duration = time.perf_counter() - start_time
+    print(f"{converted} puzzles converted, {failed} failed in {duration:.2f} s "
+          f"({converted / duration if duration > 0 else 0:.0f} puzzles/s)", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
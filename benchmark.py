@@ -0,0 +1,235 @@
+"""
+Benchmarks of the hot paths of the game, the conversions and the GUI drawing
+
+Every benchmark runs on boards of several sizes up to 56 tiles and is timed with timeit (best and median of
+ROUNDS * REPEATS runs, time per call). The benchmarks are timed in turns for ROUNDS rounds, so a slow phase of the
+machine only affects some runs of every benchmark. The results are saved as JSON, a stored result file can be used
+as baseline to flag regressions, a benchmark only counts as regression if both its best and its median time are
+slower, so the noise of single runs is not reported:
+
+python benchmark.py -o baseline.json
+python benchmark.py --compare baseline.json
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import timeit
+
+import start_game
+from GUI import solo_tantrix, tantrix_gui
+from hexagon_functions import get_coords_from_pos, get_neighbor, get_pos_from_coords
+
+SIZES = (7, 14, 28, 56)  # number of tiles of the benchmarked boards
+# The depth first search of get_hamiltonian_path is exponential on partially filled rings (56 tiles do not finish
+# within minutes), the path is only timed up to this number of tiles
+HAMILTONIAN_MAX_SIZE = 28
+ROUNDS = 3
+REPEATS = 3  # timed runs of every benchmark per round
+MIN_TIME = 0.2  # minimum duration of one timed run in seconds
+# a benchmark is a regression if its best and its median time are both slower than THRESHOLD times the baseline,
+# back-to-back runs of the same code differ by up to about 1.6x in single timings and up to about 1.5x in both
+THRESHOLD = 1.75
+
+
+class RecordingCanvas:
+    """
+    Stand-in for tk.Canvas that counts the created items instead of drawing them, used to time TantrixGUI.draw
+    """
+
+    def __init__(self):
+        self.created_items = 0
+        self.items = set()
+
+    def _create(self, *args, **kwargs):
+        self.created_items += 1
+        self.items.add(self.created_items)
+        return self.created_items
+
+    create_polygon = create_line = create_arc = _create
+
+    def delete(self, tag):
+        if tag == "all":
+            self.items.clear()
+
+    def move(self, tag, dx, dy):
+        pass
+
+    def tag_raise(self, tag):
+        pass
+
+
+class _Widget:
+    """Stand-in for the label and the entry of the GUI"""
+
+    def config(self, **kwargs):
+        pass
+
+    def delete(self, *args):
+        pass
+
+    def insert(self, *args):
+        pass
+
+
+def make_game(num_tiles, seed=0):
+    """Random board with num_tiles tiles arranged in a pyramid"""
+    rng = random.Random(seed)
+    codes = [solo_tantrix.ROTATED_CODES[tile][rng.randrange(6)] for tile in rng.sample(range(56), num_tiles)]
+    return solo_tantrix.Tantrix(codes, None)
+
+
+def make_puzzle(num_tiles, seed=0):
+    """Random puzzle [[fields], [tiles], [rotations]] on the fields 0 to num_tiles - 1"""
+    rng = random.Random(seed)
+    return [[*range(num_tiles)], rng.sample(range(56), num_tiles), [rng.randrange(6) for _ in range(num_tiles)]]
+
+
+def make_gui(game):
+    """TantrixGUI on a RecordingCanvas, without Tk window"""
+    gui = object.__new__(tantrix_gui.TantrixGUI)
+    gui._game = game
+    gui.current_tile_code = None
+    gui.mouse_position = None
+    gui.drag_position = None
+    gui._mouse_drag = False
+    gui.drawn_codes = {}
+    gui.init_grid()
+    gui.canvas = RecordingCanvas()
+    gui.error_label = _Widget()
+    gui.puzzle_size_entry = _Widget()
+    return gui
+
+
+def get_benchmarks(sizes):
+    """
+    Generate (name, number of tiles, function without arguments) for all benchmarks
+    """
+    for size in sizes:
+        fields = [*range(size)]
+        coords = [get_coords_from_pos(field) for field in fields]
+        yield "get_coords_from_pos", size, lambda fields=fields: [get_coords_from_pos(field) for field in fields]
+        yield "get_pos_from_coords", size, lambda coords=coords: [get_pos_from_coords(coord) for coord in coords]
+        yield "get_neighbor", size, \
+            lambda fields=fields: [get_neighbor(field, edge) for field in fields for edge in range(6)]
+        yield "create_graph", size, lambda fields=fields: start_game.create_graph(fields)
+        if size <= HAMILTONIAN_MAX_SIZE:
+            graph = start_game.create_graph(fields)
+            yield "get_hamiltonian_path", size, \
+                lambda fields=fields, graph=graph: start_game.get_hamiltonian_path(fields, graph)
+
+        puzzle = make_puzzle(size)
+        tile_value = make_game(size).get_tile_value()
+        yield "transform_tantrix_puzzle_to_gui_format", size, \
+            lambda puzzle=puzzle: start_game.transform_tantrix_puzzle_to_gui_format(puzzle)
+        yield "transform_gui_puzzle_to_tantrix_format", size, \
+            lambda tile_value=tile_value: start_game.transform_gui_puzzle_to_tantrix_format(tile_value)
+
+        game = make_game(size)
+        # reads the mismatch count that is kept up to date on every move
+        yield "is_legal", size, lambda game=game: game.is_legal(count_errors=1)
+        # looks up the loop lengths of ColorLines
+        yield "has_loop", size, lambda game=game: game.has_loop("B", size)
+        yield "shuffle_tiles", size, game.shuffle_tiles
+        yield "move_to_pyramid", size, game.move_to_pyramid
+
+        gui = make_gui(make_game(size))
+
+        def full_draw(gui=gui):
+            gui.full_redraw = True  # draw every cell, not only the changed ones
+            gui.draw()
+
+        yield "draw", size, full_draw
+
+
+def run_benchmarks(sizes=SIZES, rounds=ROUNDS, repeats=REPEATS, min_time=MIN_TIME, name_filter=None):
+    """
+    Time all benchmarks, every round times each benchmark repeats times
+    :return: dictionary "name[tiles]" -> {"name", "tiles", "seconds" (best time per call), "median" (median time per
+             call), "calls"}, draw also stores the number of canvas items of one full draw
+    """
+    random.seed(0)  # shuffle_tiles uses the global random generator
+    benchmarks = [(name, size, function) for name, size, function in get_benchmarks(sizes)
+                  if not name_filter or name_filter in name]
+    timers = {}  # key -> (timeit.Timer, calls per run)
+    times = {}  # key -> times per call of all runs
+    for _ in range(rounds):
+        for name, size, function in benchmarks:
+            key = f"{name}[{size}]"
+            if key not in timers:
+                timer = timeit.Timer(function)
+                calls, duration = timer.autorange()
+                timers[key] = timer, max(1, int(calls * min_time / max(duration, 1e-9)))
+                times[key] = []
+            timer, calls = timers[key]
+            times[key].extend(seconds / calls for seconds in timer.repeat(repeat=repeats, number=calls))
+    results = {}
+    for name, size, _ in benchmarks:
+        key = f"{name}[{size}]"
+        best = min(times[key])
+        result = {"name": name, "tiles": size, "seconds": best, "median": statistics.median(times[key]),
+                  "calls": timers[key][1]}
+        if name == "draw":
+            canvas = RecordingCanvas()
+            gui = make_gui(make_game(size))
+            gui.canvas = canvas
+            gui.full_redraw = True
+            gui.draw()
+            result["canvas_items"] = canvas.created_items
+        results[key] = result
+        print(f"{name:<42}{size:>4} tiles {best * 1e6:>12.1f} us", file=sys.stderr)
+    return results
+
+
+def compare_results(results, baseline, threshold=THRESHOLD):
+    """
+    Compare results with a baseline of run_benchmarks, the median is compared as well if both have one
+    :return: list of (key, baseline seconds, seconds, ratio) of the benchmarks whose best time and median time are
+             slower than threshold times the baseline (ratio of the best times)
+    """
+    regressions = []
+    for key, result in results.items():
+        if key in baseline:
+            ratio = result["seconds"] / baseline[key]["seconds"]
+            median_ratio = ratio
+            if "median" in result and "median" in baseline[key]:
+                median_ratio = result["median"] / baseline[key]["median"]
+            if min(ratio, median_ratio) > threshold:
+                regressions.append((key, baseline[key]["seconds"], result["seconds"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths of the Tantrix game.")
+    parser.add_argument("-o", "--output", default=None, help="Write the results as JSON to this file")
+    parser.add_argument("--compare", default=None, help="JSON file of an earlier run, flag regressions against it")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help=f"Slowdown factor that counts as regression (default: {THRESHOLD})")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="Numbers of tiles of the boards")
+    parser.add_argument("--filter", default=None, help="Only run benchmarks whose name contains this string")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(sizes=args.sizes, name_filter=args.filter)
+    report = {"python": platform.python_version(), "platform": platform.platform(), "results": results}
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+        regressions = compare_results(results, baseline, args.threshold)
+        for key, baseline_seconds, seconds, ratio in regressions:
+            print(f"REGRESSION {key}: {baseline_seconds * 1e6:.1f} us -> {seconds * 1e6:.1f} us ({ratio:.2f}x)",
+                  file=sys.stderr)
+        print(f"{len(regressions)} regressions against {args.compare}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
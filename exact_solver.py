@@ -0,0 +1,131 @@
+"""
+Exact backtracking solver for Tantrix puzzles with a fixed shape
+
+The solver fills the cells of a puzzle (see annealing for the cell model) one by one, always choosing the empty cell
+with the fewest fitting placements left. Placements (tile, rotation) are encoded as bits tile * 6 + rotation of an
+integer, so the placements fitting an edge color, the placements of unused tiles and their intersection are single
+bitmask operations. A cell without any fitting placement prunes the whole branch. If no solution is returned,
+the puzzle is proven unsolvable.
+"""
+from annealing import get_board_cells
+from GUI.solo_tantrix import CODES, COLOR_IDS, DIRECTIONS, EDGE_COLORS, ROTATED_CODES, reverse_direction
+from start_game import get_puzzle_neighbors, split_puzzle
+
+NUM_ROTATIONS = 6
+
+# Bitmask of the six placements of every tile
+TILE_PLACEMENTS = [((1 << NUM_ROTATIONS) - 1) << (tile * NUM_ROTATIONS) for tile in range(len(CODES))]
+# Bitmask of all placements that have the given color id at the edge in the given direction, [direction][color]
+EDGE_PLACEMENTS = [[sum(1 << (tile * NUM_ROTATIONS + rotation)
+                        for tile in range(len(CODES)) for rotation in range(NUM_ROTATIONS)
+                        if EDGE_COLORS[tile, rotation, direction] == color)
+                    for color in range(max(COLOR_IDS.values()) + 1)]
+                   for direction in DIRECTIONS]
+EDGE_COLOR_LIST = EDGE_COLORS.tolist()
+REVERSED_DIRECTIONS = [reverse_direction(direction) for direction in DIRECTIONS]
+
+
+def iter_solutions(tiles, neighbors, use_all_tiles=True, shuffle=None, node_budget=None):
+    """
+    Generate every assignment of the tiles to the cells in which all adjacent edges match
+    :param tiles: tile ids, exactly one per cell
+    :param neighbors: neighbor table of shape (cells, 6) in DIRECTIONS order, -1 for missing neighbors
+    :param use_all_tiles: if false, tiles is a pool of at least as many tiles as cells and the assignments of every
+                          selection of them are generated
+    :param shuffle: function that shuffles a list in place (e.g. random.Random.shuffle), if given the equally
+                    constrained cells are taken in random order and the placements of a cell are tried in random order
+    :param node_budget: maximal number of tried placements, the search ends early (no proof of unsolvability)
+    :return: generator of (tile ids per cell, rotations per cell)
+    """
+    neighbors = neighbors.tolist() if hasattr(neighbors, "tolist") else [list(row) for row in neighbors]
+    if len(tiles) != len(neighbors) and (use_all_tiles or len(tiles) < len(neighbors)):
+        raise ValueError(f"{len(tiles)} tiles do not fit onto {len(neighbors)} fields")
+    num_cells = len(neighbors)
+    cell_tiles = [None] * num_cells
+    cell_rotations = [0] * num_cells
+    cell_order = list(range(num_cells))  # order of the equally constrained cells
+    if shuffle is not None:
+        shuffle(cell_order)
+    nodes = 0
+
+    def fitting_placements(cell, free_placements):
+        """Placements of unused tiles that match all neighbors placed so far"""
+        placements = free_placements
+        for direction, neighbor in enumerate(neighbors[cell]):
+            if neighbor >= 0 and cell_tiles[neighbor] is not None:
+                color = EDGE_COLOR_LIST[cell_tiles[neighbor]][cell_rotations[neighbor]][REVERSED_DIRECTIONS[direction]]
+                placements &= EDGE_PLACEMENTS[direction][color]
+        return placements
+
+    def search(placed, free_placements):
+        nonlocal nodes
+        if placed == num_cells:
+            yield cell_tiles[:], cell_rotations[:]
+            return
+        # Most constrained empty cell first, a cell without fitting placements ends the branch
+        best_cell, best_placements, best_count = None, 0, None
+        for cell in cell_order:
+            if cell_tiles[cell] is None:
+                placements = fitting_placements(cell, free_placements)
+                count = bin(placements).count("1")
+                if count == 0:
+                    return
+                if best_count is None or count < best_count:
+                    best_cell, best_placements, best_count = cell, placements, count
+        candidates = []
+        placements = best_placements
+        while placements:
+            lowest = placements & -placements
+            placements ^= lowest
+            candidates.append(lowest.bit_length() - 1)
+        if shuffle is not None:
+            shuffle(candidates)
+        for placement in candidates:
+            nodes += 1
+            if node_budget is not None and nodes > node_budget:
+                return
+            tile, rotation = divmod(placement, NUM_ROTATIONS)
+            cell_tiles[best_cell], cell_rotations[best_cell] = tile, rotation
+            yield from search(placed + 1, free_placements & ~TILE_PLACEMENTS[tile])
+        cell_tiles[best_cell] = None
+
+    tile_set = 0  # bitmask of the tile set, every tile may be used once
+    for tile in tiles:
+        if tile_set >> tile & 1:
+            raise ValueError(f"tile {tile} is used more than once")
+        tile_set |= 1 << tile
+    yield from search(0, sum(TILE_PLACEMENTS[tile] for tile in tiles))
+
+
+def solve_exact(tiles, neighbors, max_solutions=None):
+    """
+    Return all (or at most max_solutions) solutions of iter_solutions as list, an empty list proves that the tiles
+    cannot be arranged on the cells
+    """
+    solutions = []
+    for solution in iter_solutions(tiles, neighbors):
+        solutions.append(solution)
+        if max_solutions is not None and len(solutions) >= max_solutions:
+            break
+    return solutions
+
+
+def solve_puzzle_exact(puzzle, max_solutions=None):
+    """
+    Solve a puzzle in one of the formats read by start_game.parse_sol on its fields
+    :return: list of solutions in the format [[fields], [tiles], [rotations]]
+    """
+    fields, tiles, _ = split_puzzle(puzzle)
+    return [[fields, solution_tiles, solution_rotations]
+            for solution_tiles, solution_rotations in solve_exact(tiles, get_puzzle_neighbors(fields), max_solutions)]
+
+
+def solve_board_exact(game, max_solutions=None):
+    """
+    Solve the arrangement on a Tantrix board (for example after move_to_pyramid) on the fields of its tiles
+    :return: list of solutions as dictionaries of grid indices and tile codes (see Tantrix.get_tile_value)
+    """
+    cells, tiles, _, neighbors = get_board_cells(game)
+    return [{grid_index: ROTATED_CODES[tile][rotation]
+             for grid_index, tile, rotation in zip(cells, solution_tiles, solution_rotations)}
+            for solution_tiles, solution_rotations in solve_exact(tiles, neighbors, max_solutions)]
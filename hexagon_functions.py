@@ -1,4 +1,80 @@
-import numpy as np
+import math
+import os
+
+# NumPy wird erst beim ersten Aufruf einer Funktion importiert, die Arrays erzeugt (siehe _get_numpy), damit die
+# Kommandozeilen-Werkzeuge ohne NumPy schnell starten (die geschlossenen Formen und get_neighbor kommen ohne aus)
+
+# Eckpunkte der Ringe (in Vielfachen der Ringnummer) und Laufrichtung entlang der jeweiligen Seite,
+# beginnend unten links und gegen den UZS (siehe Feld-Nummerierung im README)
+RING_CORNERS = ((-1, -1), (0, -1), (1, 0), (1, 1), (0, 1), (-1, 0))
+SIDE_STEPS = ((1, 0), (1, 1), (0, 1), (-1, 0), (-1, -1), (0, -1))
+
+# Verschiebung der Koordinaten beim Übergang über die jeweilige Kante eines Feldes
+EDGE_STEPS = ((-1, -1), (0, -1), (1, 0), (1, 1), (0, 1), (-1, 0))
+
+# Radius (Anzahl der Ringe um das Zentrum), bis zu dem die Nachbarschaftstabelle mindestens vorberechnet wird,
+# Ring 7 endet mit Feld 168 und reicht damit für alle 56 Spielsteine
+NEIGHBOR_TABLE_RADIUS = 7
+# Optionaler Pfad (.npy) zum Zwischenspeichern der Tabelle auf der Festplatte, wird per memory-map geladen
+NEIGHBOR_TABLE_CACHE = None
+
+_neighbor_table = None
+_numpy = None
+
+
+def _get_numpy():
+    """
+    NumPy beim ersten Aufruf importieren und das Modul zurückgeben
+    """
+    global _numpy
+    if _numpy is None:
+        import numpy
+        _numpy = numpy
+    return _numpy
+
+
+def _ring_of_pos(pos):
+    """
+    Kleinster Ring, für den 3 * ring * (ring + 1) >= pos gilt (exakt über Ganzzahl-Wurzel)
+    """
+    ring = (math.isqrt(12 * pos + 9) - 3) // 6
+    if 3 * ring * (ring + 1) < pos:
+        ring += 1
+    return ring
+
+
+def _coords_from_pos(pos):
+    """
+    Geschlossene Form von get_coords_from_pos, gibt die Koordinaten als Tupel (x, y) zurück
+    """
+    if pos == 0:
+        return 0, 0
+    ring = _ring_of_pos(pos)
+    side, offset = divmod(pos - 3 * ring * (ring - 1) - 1, ring)
+    return (ring * RING_CORNERS[side][0] + offset * SIDE_STEPS[side][0],
+            ring * RING_CORNERS[side][1] + offset * SIDE_STEPS[side][1])
+
+
+def _pos_from_coords(x, y):
+    """
+    Geschlossene Form von get_pos_from_coords für ganzzahlige Koordinaten x, y
+    """
+    ring = max(abs(x), abs(y), abs(x - y))
+    if ring == 0:
+        return 0
+    if y == -ring and x < 0:
+        side, offset = 0, x + ring
+    elif x - y == ring and x < ring:
+        side, offset = 1, x
+    elif x == ring and y < ring:
+        side, offset = 2, y
+    elif y == ring and x > 0:
+        side, offset = 3, ring - x
+    elif y - x == ring and x > -ring:
+        side, offset = 4, -x
+    else:
+        side, offset = 5, -y
+    return 3 * ring * (ring - 1) + 1 + side * ring + offset
 
 
 def get_coords_from_pos(pos):
@@ -9,41 +85,9 @@ def get_coords_from_pos(pos):
                 unten gehend gegen den UZS durchnummeriert
     :return: Koordinaten im Hexagon-KoSy
     """
-    if pos == 0:
-        return np.array([0, 0])
-
-    def step(sd, stepsize):
-        crds = np.array([0, 0])
-        if sd == 0:
-            crds += np.array([stepsize, 0])
-        elif sd == 1:
-            crds += np.array([stepsize, stepsize])
-        elif sd == 2:
-            crds += np.array([0, stepsize])
-        elif sd == 3:
-            crds += np.array([-stepsize, 0])
-        elif sd == 4:
-            crds += np.array([-stepsize, - stepsize])
-        elif sd == 5:
-            crds += np.array([0, -stepsize])
-        return crds
-
-    ring = 0
-    total_positions = 0
-    while total_positions < pos:
-        ring += 1
-        total_positions += 6 * ring
-    pos_in_ring = pos - (total_positions - 6 * ring) - 1
-    side_length = ring
-    coords = np.array([-ring, -ring])
-    side = pos_in_ring // side_length
-    offset = pos_in_ring % side_length
-    side_counter = 0
-    while side_counter != side:
-        coords += step(side_counter, side_length)
-        side_counter += 1
-    coords += step(side, offset)
-    return coords
+    np = _get_numpy()
+
+    return np.array(_coords_from_pos(int(pos)))
 
 
 def get_pos_from_coords(coords):
@@ -53,44 +97,117 @@ def get_pos_from_coords(coords):
     :return: die Position des Spielsteins in der definierten Systematik (mit 0 startend in der Mitte, dann nach
                 unten gehend gegen den UZS durchnummeriert
     """
-    start_coords = np.array([0, 0])
-    if np.array_equal(coords, start_coords):
-        return 0
-    pos = 1
     x, y = coords
-    if x == y and y < 0:
-        return pos + (abs(x) * (abs(x) - 1) * 3)
-        # coords += np.array([1, 1])
-        # x, y = [coords[i] for i in range(2)]
-        # pos += 1
-    while not np.array_equal(coords, start_coords):
-        moving_dir = np.array([0, 0])
-        if x == 0:
-            # if y > 0:
-            moving_dir = np.array([1, 0]) * np.sign(y)
-            # elif y < 0:
-            #     moving_dir = np.array([-1, 0])
-        elif y == 0:
-            # if x > 0:
-            moving_dir = np.array([-1, -1]) * np.sign(x)
-            # elif x < 0:
-            #     moving_dir = np.array([1, 1])
-        elif x == y:
-            return pos + (abs(x) * (abs(x) - 1) * 3) + (3 * abs(x))
-            # moving_dir = np.array([0, np.sign(x) * (-1)])
-        elif x < 0 < y or x > 0 > y:
-            moving_dir = np.array([1, 1]) * np.sign(y)
-        elif np.sign(x) == np.sign(y) and x != y:
-            if abs(y) > abs(x):
-                moving_dir = np.array([np.sign(x) * 1, 0])
-            else:
-                moving_dir = np.array([0, np.sign(x) * (-1)])
-        coords += moving_dir
-        x, y = coords
-        pos += 1
-        if x == y and x < 0:
-            return pos + (abs(x) * (abs(x) - 1) * 3)
-    return pos
+    return _pos_from_coords(int(x), int(y))
+
+
+def get_coords_from_positions(positions):
+    """
+    Vektorisierte Variante von get_coords_from_pos für viele Felder auf einmal
+    :param positions: Feld-Nummern als Array (beliebige Form)
+    :return: Array der Form positions.shape + (2,) mit den Koordinaten im Hexagon-KoSy
+    """
+    np = _get_numpy()
+
+    pos = np.asarray(positions, dtype=np.int64)
+    ring = np.floor((np.sqrt(12.0 * pos + 9.0) - 3.0) / 6.0).astype(np.int64)
+    ring += 3 * ring * (ring + 1) < pos  # Rundungsfehler der Wurzel korrigieren
+    safe_ring = np.maximum(ring, 1)  # Feld 0 gesondert behandeln (keine Division durch 0)
+    side, offset = np.divmod(pos - 3 * ring * (ring - 1) - 1, safe_ring)
+    side = np.where(ring == 0, 0, side)
+    corners = np.array(RING_CORNERS)
+    steps = np.array(SIDE_STEPS)
+    coords = ring[..., None] * corners[side] + offset[..., None] * steps[side]
+    coords[ring == 0] = 0
+    return coords
+
+
+def get_coords_list(positions):
+    """
+    Variante von get_coords_from_positions ohne NumPy für wenige Felder
+    :param positions: Feld-Nummern
+    :return: Liste der Koordinaten (x, y) im Hexagon-KoSy
+    """
+    return [_coords_from_pos(int(pos)) for pos in positions]
+
+
+def get_positions_from_coords(coords):
+    """
+    Vektorisierte Variante von get_pos_from_coords für viele Koordinaten auf einmal
+    :param coords: Array der Form (..., 2) mit Koordinaten im Hexagon-KoSy
+    :return: Array mit den Feld-Nummern in der definierten Systematik
+    """
+    np = _get_numpy()
+
+    coords = np.asarray(coords, dtype=np.int64)
+    x, y = coords[..., 0], coords[..., 1]
+    ring = np.maximum(np.maximum(np.abs(x), np.abs(y)), np.abs(x - y))
+    # Reihenfolge der Bedingungen wie in _pos_from_coords, die erste zutreffende Seite gewinnt
+    conditions = [(y == -ring) & (x < 0),
+                  (x - y == ring) & (x < ring),
+                  (x == ring) & (y < ring),
+                  (y == ring) & (x > 0),
+                  (y - x == ring) & (x > -ring)]
+    side = np.select(conditions, [0, 1, 2, 3, 4], default=5)
+    offset = np.select(conditions, [x + ring, x, y, ring - x, -x], default=-y)
+    pos = 3 * ring * (ring - 1) + 1 + side * ring + offset
+    return np.where(ring == 0, 0, pos)
+
+
+def get_ring(pos):
+    """
+    Nummer des Rings um das Zentrum, auf dem das Feld pos liegt (Feld 0 liegt auf Ring 0)
+    """
+    return _ring_of_pos(int(pos))
+
+
+def get_field_count(radius):
+    """
+    Anzahl der Felder vom Zentrum bis einschließlich des angegebenen Rings
+    """
+    return 3 * radius * (radius + 1) + 1
+
+
+def build_neighbor_table(radius):
+    """
+    Nachbarschaftstabelle für alle Felder bis einschließlich Ring radius berechnen
+    :param radius: äußerster Ring der Tabelle
+    :return: Array der Form (Felder, 6), Eintrag [feld, kante] ist die Feld-Nummer des Nachbarn an dieser Kante
+    """
+    np = _get_numpy()
+
+    coords = get_coords_from_positions(np.arange(get_field_count(radius)))
+    return get_positions_from_coords(coords[:, None, :] + np.array(EDGE_STEPS)).astype(np.int32)
+
+
+def get_neighbor_table(num_fields=0, cache_file=None):
+    """
+    Vorberechnete Nachbarschaftstabelle holen, die mindestens die Felder 0 bis num_fields - 1 abdeckt. Die Tabelle
+    wird einmal pro Prozess aufgebaut (bzw. aus cache_file per memory-map geladen) und nur bei Bedarf vergrößert
+    :param num_fields: Anzahl der Felder, deren Nachbarn abgefragt werden sollen
+    :param cache_file: Pfad zur .npy-Datei, Standard ist NEIGHBOR_TABLE_CACHE (None: nicht zwischenspeichern)
+    :return: Array der Form (Felder, 6), siehe build_neighbor_table
+    """
+    global _neighbor_table
+    np = _get_numpy()
+
+    if _neighbor_table is not None and len(_neighbor_table) >= num_fields:
+        return _neighbor_table
+    if cache_file is None:
+        cache_file = NEIGHBOR_TABLE_CACHE
+    radius = max(NEIGHBOR_TABLE_RADIUS, _ring_of_pos(max(num_fields - 1, 0)))
+    table = None
+    if cache_file is not None and os.path.exists(cache_file):
+        table = np.load(cache_file, mmap_mode="r")
+        if len(table) < max(num_fields, get_field_count(NEIGHBOR_TABLE_RADIUS)):  # zu klein, neu berechnen
+            table = None
+    if table is None:
+        table = build_neighbor_table(radius)
+        if cache_file is not None:
+            with open(cache_file, "wb") as cache:
+                np.save(cache, table)
+    _neighbor_table = table
+    return _neighbor_table
 
 
 def get_neighbor(field_number, edge):
@@ -100,15 +217,7 @@ def get_neighbor(field_number, edge):
     :param edge: die Kante des betrachteten Feldes, welche eine gemeinsame Kante mit den Nachbarn ist
     :return: die Postion des Nachbarn in der definierten Systematik
     """
-    tile_coords = get_coords_from_pos(field_number)
-    direction_map = {
-        0: np.array([-1, -1]),
-        1: np.array([0, -1]),
-        2: np.array([1, 0]),
-        3: np.array([1, 1]),
-        4: np.array([0, 1]),
-        5: np.array([-1, 0])
-    }
-    target_coords = tile_coords + direction_map[edge]
-    nbr = get_pos_from_coords(target_coords)
-    return nbr
+    if _neighbor_table is not None and field_number < len(_neighbor_table):
+        return int(_neighbor_table[field_number, edge])
+    x, y = _coords_from_pos(int(field_number))
+    return _pos_from_coords(x + EDGE_STEPS[edge][0], y + EDGE_STEPS[edge][1])
@@ -0,0 +1,156 @@
+"""
+Generator of puzzles that are guaranteed to be solvable
+
+A solved board is built by constructive placement: the cells of the requested shape are filled one by one, always the
+empty cell with the fewest fitting placements first, with a random fitting (tile, rotation) out of the tile pool
+(the search of exact_solver.iter_solutions in random order). Dead ends are resolved by backtracking, a search that
+exceeds its node budget is restarted. The solution is then scrambled (tiles shuffled over the fields and rotated
+randomly). Puzzle number k of a run only depends on the seed and k, so the output is the same for any number of worker
+processes:
+
+python puzzle_generator.py 1000000 --tiles 10 --shape pyramid --seed 1 -o puzzles.jsonl
+"""
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import time
+
+from exact_solver import NUM_ROTATIONS, iter_solutions
+from hexagon_functions import EDGE_STEPS, get_pos_from_coords
+from start_game import get_puzzle_neighbors
+
+SHAPES = ("spiral", "pyramid", "random")
+NODE_BUDGET = 2000  # placements per search before restarting with a new random order
+MAX_RESTARTS = 1000  # searches before the tile pool is considered unusable for the shape
+CHUNK_SIZE = 256  # puzzles per task of a worker process
+
+
+def get_shape_fields(num_tiles, shape="spiral", rng=None):
+    """
+    Fields (see field enumeration in README) of a puzzle shape:
+    spiral: the fields 0 to num_tiles - 1 around the center,
+    pyramid: triangle of fields row by row (the last row is partially filled if num_tiles is not a triangle number),
+    random: connected shape grown from the center by adding random neighboring fields (rng: random.Random)
+    """
+    if shape == "spiral":
+        return [*range(num_tiles)]
+    if shape == "pyramid":  # rows 0 <= y <= x of the hexagon coordinates form a triangle
+        coords = [(x, y) for x in range(num_tiles) for y in range(x + 1)][:num_tiles]
+        return [get_pos_from_coords(coord) for coord in coords]
+    if shape == "random":
+        rng = rng or random.Random()
+        coords = [(0, 0)]
+        coord_set = {(0, 0)}
+        while len(coords) < num_tiles:
+            x, y = rng.choice(coords)
+            step_x, step_y = rng.choice(EDGE_STEPS)
+            if (x + step_x, y + step_y) not in coord_set:
+                coords.append((x + step_x, y + step_y))
+                coord_set.add((x + step_x, y + step_y))
+        return [get_pos_from_coords(coord) for coord in coords]
+    raise ValueError(f"unknown shape {shape!r}, use one of {SHAPES}")
+
+
+def build_solution(neighbors, pool, rng, node_budget=NODE_BUDGET, max_restarts=MAX_RESTARTS):
+    """
+    Fill every cell with a different tile of pool so that all adjacent edges match
+    :param neighbors: neighbor table of shape (cells, 6) in DIRECTIONS order, -1 for missing neighbors
+    :param pool: tile ids that may be used
+    :param rng: random.Random
+    :param node_budget: number of placements before the search is restarted
+    :param max_restarts: number of searches before a ValueError is raised
+    :return: (tile ids per cell, rotations per cell)
+    """
+    tiles = sorted(set(pool))
+    if len(neighbors) > len(tiles):
+        raise ValueError(f"{len(neighbors)} fields need more than the {len(tiles)} tiles of the pool")
+    for _ in range(max_restarts):
+        for solution in iter_solutions(tiles, neighbors, use_all_tiles=False, shuffle=rng.shuffle,
+                                       node_budget=node_budget):
+            return solution
+    raise ValueError(f"no solution found with the tile pool within {max_restarts} searches")
+
+
+def scramble_solution(solution, rng):
+    """
+    Shuffle the tiles of a solution [[fields], [tiles], [rotations]] over its fields and rotate them randomly
+    """
+    fields, tiles, _ = solution
+    tiles = list(tiles)
+    rng.shuffle(tiles)
+    return [list(fields), tiles, [rng.randrange(NUM_ROTATIONS) for _ in tiles]]
+
+
+def generate_puzzle(num_tiles, shape="spiral", seed=None, pool=None):
+    """
+    Generate a solvable puzzle
+    :return: (scrambled puzzle, solution), both in the format [[fields], [tiles], [rotations]]
+    """
+    rng = random.Random(seed)
+    fields = get_shape_fields(num_tiles, shape, rng)
+    tiles, rotations = build_solution(get_puzzle_neighbors(fields), range(56) if pool is None else pool, rng)
+    solution = [fields, tiles, rotations]
+    return scramble_solution(solution, rng), solution
+
+
+def _generate_indexed(task):
+    """Worker function, generate puzzle number index of a run from (index, seed, num_tiles, shape, pool)"""
+    index, seed, num_tiles, shape, pool = task
+    return index, generate_puzzle(num_tiles, shape, seed=f"{seed}-{index}", pool=pool)
+
+
+def generate_puzzles(count, num_tiles, shape="spiral", seed=0, pool=None, processes=None, start=0):
+    """
+    Generate the puzzles start to start + count - 1 of a run in a process pool, in order
+    :return: generator of (index, scrambled puzzle, solution)
+    """
+    tasks = ((index, seed, num_tiles, shape, pool) for index in range(start, start + count))
+    if processes == 1:
+        for index, (puzzle, solution) in map(_generate_indexed, tasks):
+            yield index, puzzle, solution
+        return
+    with multiprocessing.Pool(processes) as pool_workers:
+        for index, (puzzle, solution) in pool_workers.imap(_generate_indexed, tasks, chunksize=CHUNK_SIZE):
+            yield index, puzzle, solution
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate solvable Tantrix puzzles as JSONL.")
+    parser.add_argument("count", type=int, help="Number of puzzles")
+    parser.add_argument("--tiles", type=int, default=10, help="Number of tiles per puzzle (default: 10)")
+    parser.add_argument("--shape", choices=SHAPES, default="spiral", help="Shape of the puzzles (default: spiral)")
+    parser.add_argument("--pool", type=str, default=None,
+                        help="Tile ids that may be used, e.g. \"[0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13]\" "
+                             "(default: all 56 tiles)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the run (default: 0)")
+    parser.add_argument("--start", type=int, default=0, help="Index of the first puzzle, to continue a run")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: number of cores)")
+    parser.add_argument("--puzzles-only", action="store_true",
+                        help="Write only the scrambled puzzles (format of batch_convert.py) instead of JSON objects "
+                             "with index, puzzle and solution")
+    parser.add_argument("-o", "--output", default="-", help="Output file, - for stdout (default)")
+    args = parser.parse_args(argv)
+
+    pool = json.loads(args.pool) if args.pool else None
+    target = sys.stdout if args.output == "-" else open(args.output, "w")
+    start_time = time.perf_counter()
+    try:
+        for index, puzzle, solution in generate_puzzles(args.count, args.tiles, args.shape, args.seed, pool,
+                                                        args.processes, args.start):
+            if args.puzzles_only:
+                target.write(json.dumps(puzzle) + "\n")
+            else:
+                target.write(json.dumps({"index": index, "puzzle": puzzle, "solution": solution}) + "\n")
+    finally:
+        if target is not sys.stdout:
+            target.close()
+    duration = time.perf_counter() - start_time
+    print(f"{args.count} puzzles generated in {duration:.2f} s ({args.count / max(duration, 1e-9):.0f} puzzles/s)",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Binary puzzle library, a file of many puzzles with random access to every puzzle
+
+Layout (little endian):
+header: magic b"TXPL", version (uint16), reserved (uint16), number of puzzles (uint64), offset of the index (uint64)
+records: number of tiles (uint8), then 3 bytes per tile with field (15 bits), tile id (6 bits) and rotation (3 bits)
+index: offset of every record (uint64)
+
+The reader maps the file into memory (mmap), puzzle number k is read from the index and decoded without touching the
+other records. Libraries are packed from and unpacked to JSONL files (see batch_convert.py):
+
+python puzzle_library.py pack puzzles.jsonl -o puzzles.tpl
+python puzzle_library.py unpack puzzles.tpl --index 42
+python start_game.py --library puzzles.tpl --index 42
+"""
+import argparse
+import json
+import mmap
+import struct
+import sys
+
+from batch_convert import convert, puzzle_from_json
+from tantrix_cli import validate_puzzle
+
+MAGIC = b"TXPL"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQQ")
+OFFSET = struct.Struct("<Q")
+TILE_BITS = 6
+ROTATION_BITS = 3
+MAX_FIELD = (1 << (24 - TILE_BITS - ROTATION_BITS)) - 1
+MAX_TILES = 255
+
+
+def pack_puzzle(puzzle):
+    """
+    Encode a puzzle [[fields], [tiles], [rotations]] as record of the library
+    """
+    fields, tiles, rotations = puzzle
+    if len(tiles) > MAX_TILES:
+        raise ValueError(f"a record holds at most {MAX_TILES} tiles, got {len(tiles)}")
+    record = bytearray([len(tiles)])
+    for field, tile, rotation in zip(fields, tiles, rotations):
+        if not 0 <= field <= MAX_FIELD:
+            raise ValueError(f"field {field} is out of range 0 to {MAX_FIELD}")
+        if not (0 <= tile < 1 << TILE_BITS and 0 <= rotation < 6):
+            raise ValueError(f"tile {tile} with rotation {rotation} cannot be stored")
+        value = (field << (TILE_BITS + ROTATION_BITS)) | (tile << ROTATION_BITS) | rotation
+        record += value.to_bytes(3, "little")
+    return bytes(record)
+
+
+def unpack_puzzle(buffer, offset=0):
+    """
+    Decode the record at offset of buffer into [[fields], [tiles], [rotations]]
+    """
+    num_tiles = buffer[offset]
+    fields, tiles, rotations = [], [], []
+    for position in range(offset + 1, offset + 1 + 3 * num_tiles, 3):
+        value = int.from_bytes(buffer[position:position + 3], "little")
+        fields.append(value >> (TILE_BITS + ROTATION_BITS))
+        tiles.append((value >> ROTATION_BITS) & ((1 << TILE_BITS) - 1))
+        rotations.append(value & ((1 << ROTATION_BITS) - 1))
+    return [fields, tiles, rotations]
+
+
+def write_library(file_name, puzzles):
+    """
+    Write the puzzles ([[fields], [tiles], [rotations]], any iterable) as library, return the number of puzzles
+    """
+    offsets = []
+    with open(file_name, "wb") as library_file:
+        library_file.write(HEADER.pack(MAGIC, VERSION, 0, 0, 0))  # completed when the index is known
+        position = HEADER.size
+        for puzzle in puzzles:
+            record = pack_puzzle(puzzle)
+            library_file.write(record)
+            offsets.append(position)
+            position += len(record)
+        for offset in offsets:
+            library_file.write(OFFSET.pack(offset))
+        library_file.seek(0)
+        library_file.write(HEADER.pack(MAGIC, VERSION, 0, len(offsets), position))
+    return len(offsets)
+
+
+class PuzzleLibrary:
+    """
+    Read only access to a library file, library[k] is puzzle number k as [[fields], [tiles], [rotations]]
+    """
+
+    def __init__(self, file_name):
+        """
+        Map the library file into memory and read the header
+        """
+        self._file = open(file_name, "rb")
+        try:
+            self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._file.close()
+            raise ValueError(f"{file_name} is not a puzzle library")
+        if len(self._buffer) < HEADER.size:
+            self.close()
+            raise ValueError(f"{file_name} is not a puzzle library")
+        magic, version, _, self._count, self._index_offset = HEADER.unpack_from(self._buffer)
+        if magic != MAGIC or version != VERSION or self._index_offset + OFFSET.size * self._count > len(self._buffer):
+            self.close()
+            raise ValueError(f"{file_name} is not a puzzle library of version {VERSION}")
+
+    def __len__(self):
+        """
+        Return the number of puzzles
+        """
+        return self._count
+
+    def __getitem__(self, index):
+        """
+        Return puzzle number index (negative numbers count from the end), raise ValueError if its record does not lie
+        between the header and the index of the file
+        """
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(f"puzzle {index} is not in the library of {self._count} puzzles")
+        offset, = OFFSET.unpack_from(self._buffer, self._index_offset + OFFSET.size * index)
+        if not HEADER.size <= offset < self._index_offset or offset + 1 + 3 * self._buffer[offset] > self._index_offset:
+            raise ValueError(f"the record of puzzle {index} is damaged (offset {offset})")
+        return unpack_puzzle(self._buffer, offset)
+
+    def __iter__(self):
+        """
+        Generate all puzzles in order
+        """
+        for index in range(self._count):
+            yield self[index]
+
+    def close(self):
+        """
+        Unmap and close the file
+        """
+        self._buffer.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_jsonl_puzzles(lines, problems):
+    """
+    Generate the valid puzzles of a JSONL file (see batch_convert.py, objects of puzzle_generator.py contribute their
+    scrambled puzzle) as [[fields], [tiles], [rotations]], the problems of invalid lines are appended to problems
+    """
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+            if isinstance(value, dict) and "puzzle" in value:  # output of puzzle_generator.py
+                value = value["puzzle"]
+            puzzle = puzzle_from_json(value)
+        except ValueError as error:
+            problems.append(f"line {line_number}: {error}")
+            continue
+        puzzle_problems = validate_puzzle(puzzle)
+        if puzzle_problems:
+            problems.append(f"line {line_number}: {'; '.join(puzzle_problems)}")
+            continue
+        yield convert(puzzle, "fields")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack Tantrix puzzles into a binary library or read them back.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    pack_parser = subparsers.add_parser("pack", help="Write the puzzles of a JSONL file as library")
+    pack_parser.add_argument("input", help="Input file with one puzzle per line, - for stdin")
+    pack_parser.add_argument("-o", "--output", required=True, help="Library file")
+    unpack_parser = subparsers.add_parser("unpack", help="Print puzzles of a library as JSONL")
+    unpack_parser.add_argument("library", help="Library file")
+    unpack_parser.add_argument("--index", type=int, default=None, help="Only print puzzle number INDEX")
+    unpack_parser.add_argument("-o", "--output", default="-", help="Output file, - for stdout (default)")
+    args = parser.parse_args(argv)
+
+    if args.command == "pack":
+        problems = []
+        source = sys.stdin if args.input == "-" else open(args.input)
+        try:
+            count = write_library(args.output, read_jsonl_puzzles(source, problems))
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        print(f"{count} puzzles packed, {len(problems)} failed", file=sys.stderr)
+        return 1 if problems else 0
+
+    try:
+        library = PuzzleLibrary(args.library)
+    except (OSError, ValueError) as error:
+        unpack_parser.error(str(error))
+    with library:
+        if args.index is not None and not -len(library) <= args.index < len(library):
+            unpack_parser.error(f"--index {args.index} is out of range, the library has {len(library)} puzzles")
+        target = sys.stdout if args.output == "-" else open(args.output, "w")
+        try:
+            puzzles = library if args.index is None else [library[args.index]]
+            for puzzle in puzzles:
+                target.write(json.dumps(puzzle) + "\n")
+        except ValueError as error:
+            print(error, file=sys.stderr)
+            return 1
+        finally:
+            if target is not sys.stdout:
+                target.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+"""
+Local store of solved boards in an SQLite database
+
+Every solution is saved in its canonical form under translation and rotation (see symmetry.py), so translated and
+rotated copies of a solution are stored once. Mirror images are not merged, because a mirrored board consists of the
+mirror tiles of the original tiles.
+The rows are keyed by the tile set as bitmask (bit t for tile id t, 56 bits) and by the canonical key of the shape,
+both columns are indexed for queries like "all solutions of exactly these tiles" or "10 tile pyramids that only use
+blue, red and yellow":
+
+python solution_store.py add solutions.jsonl --db solutions.db
+python solution_store.py query --db solutions.db --shape pyramid --count 10 --within BRY
+python start_game.py --store solutions.db
+"""
+import argparse
+import json
+import sqlite3
+import sys
+
+from batch_convert import convert, puzzle_from_json
+from GUI.tile_codes import CODES, encode_board
+from puzzle_generator import SHAPES, get_shape_fields
+from start_game import calculate_puzzle_expansion, get_valid_gui_start_point, transform_tantrix_puzzle_to_gui_format
+from symmetry import get_canonical_key, get_canonical_puzzle, get_shape_key
+from tantrix_cli import score_puzzle, validate_puzzle
+
+DEFAULT_DATABASE = "solutions.db"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS solutions (
+    id INTEGER PRIMARY KEY,
+    tile_mask INTEGER NOT NULL,
+    num_tiles INTEGER NOT NULL,
+    shape TEXT NOT NULL,
+    canonical_key TEXT NOT NULL UNIQUE,
+    puzzle TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS solutions_tile_mask ON solutions (tile_mask);
+CREATE INDEX IF NOT EXISTS solutions_shape ON solutions (shape, num_tiles);
+"""
+
+
+def get_tile_mask(tiles):
+    """Bitmask of a set of tile ids, bit t is set for tile id t"""
+    mask = 0
+    for tile in tiles:
+        mask |= 1 << tile
+    return mask
+
+
+def get_color_mask(colors):
+    """Bitmask of the tiles that only have edges of the given colors (e.g. "BRY")"""
+    return get_tile_mask(tile for tile, code in enumerate(CODES) if set(code) <= set(colors))
+
+
+def get_solution_row(puzzle):
+    """
+    Row (tile mask, number of tiles, shape key, canonical key, canonical puzzle as JSON) of a solved puzzle in one of
+    the formats of batch_convert.py, raise ValueError if the puzzle is invalid or not solved. The canonical form only
+    uses translations and rotations, so it has the tile ids of the puzzle
+    """
+    problems = validate_puzzle(puzzle)
+    if problems:
+        raise ValueError("; ".join(problems))
+    mismatches = score_puzzle(puzzle)
+    if mismatches:
+        raise ValueError(f"puzzle is not solved ({mismatches} mismatching edges)")
+    canonical = get_canonical_puzzle(convert(puzzle, "fields"), mirror=False)
+    return (get_tile_mask(canonical[1]), len(canonical[1]), get_shape_key(canonical),
+            get_canonical_key(canonical, mirror=False), json.dumps(canonical))
+
+
+class SolutionStore:
+    """
+    SQLite database of solved boards, solutions are returned as [[fields], [tiles], [rotations]]
+    """
+
+    def __init__(self, file_name=DEFAULT_DATABASE):
+        """
+        Open (or create) the database
+        """
+        self._connection = sqlite3.connect(file_name)
+        self._connection.executescript(SCHEMA)
+
+    def __len__(self):
+        """
+        Return the number of stored solutions
+        """
+        return self._connection.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+    def add_solution(self, puzzle):
+        """
+        Store a solved puzzle, return False if a translated or rotated copy of it is stored already
+        """
+        return self.add_solutions([puzzle]) == 1
+
+    def add_solutions(self, puzzles, problems=None):
+        """
+        Store solved puzzles (any iterable) in one transaction, translated or rotated duplicates are skipped,
+        return the number of new solutions. Invalid or unsolved puzzles raise a ValueError (nothing is stored), with a
+        list problems they are skipped and their problems are appended to it
+        """
+        def get_rows():
+            for puzzle in puzzles:
+                try:
+                    yield get_solution_row(puzzle)
+                except ValueError as error:
+                    if problems is None:
+                        raise
+                    problems.append(str(error))
+
+        changes = self._connection.total_changes
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO solutions (tile_mask, num_tiles, shape, canonical_key, puzzle) "
+                "VALUES (?, ?, ?, ?, ?)", get_rows())
+        return self._connection.total_changes - changes
+
+    def find_solutions(self, tiles=None, within=None, shape=None, num_tiles=None, limit=None):
+        """
+        Return the stored solutions that match all given conditions
+        :param tiles: the solution uses exactly these tile ids
+        :param within: bitmask of tiles (see get_tile_mask, get_color_mask), the solution only uses tiles of it
+        :param shape: shape key (see symmetry.get_shape_key) of the solution
+        :param num_tiles: number of tiles of the solution
+        :param limit: maximal number of solutions
+        """
+        conditions, parameters = [], []
+        if tiles is not None:
+            conditions.append("tile_mask = ?")
+            parameters.append(get_tile_mask(tiles))
+        if within is not None:
+            conditions.append("tile_mask & ? = 0")
+            parameters.append(get_tile_mask(range(len(CODES))) & ~within)
+        if shape is not None:
+            conditions.append("shape = ?")
+            parameters.append(shape)
+        if num_tiles is not None:
+            conditions.append("num_tiles = ?")
+            parameters.append(num_tiles)
+        query = "SELECT puzzle FROM solutions"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id"
+        if limit is not None:
+            query += " LIMIT ?"
+            parameters.append(limit)
+        return [json.loads(row[0]) for row in self._connection.execute(query, parameters)]
+
+    def close(self):
+        """
+        Close the database
+        """
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def place_solution(game, puzzle):
+    """
+    Replace the tiles of a Tantrix board by a solution [[fields], [tiles], [rotations]], centered like start_game.py
+    does, return False (board unchanged) if the solution does not fit onto the board
+    """
+    codes, tile_offsets = transform_tantrix_puzzle_to_gui_format(puzzle)
+    start = get_valid_gui_start_point(game.get_tiling_size(), calculate_puzzle_expansion(tile_offsets))
+    if start is None:
+        return False
+    game.clear_board()
+    for code, offset in zip(codes, tile_offsets):
+        game.place_tile(tuple(start[dim] + offset[dim] for dim in range(3)), code)
+    return True
+
+
+def load_solution(game, store):
+    """
+    Place a stored solution of the tiles on the board of a Tantrix game onto the board, return whether one was found
+    """
+    tiles, _ = encode_board(game.get_tile_value().values())
+    for solution in store.find_solutions(tiles=tiles):
+        if place_solution(game, solution):
+            return True
+    return False
+
+
+def read_solutions(lines, problems):
+    """
+    Generate the puzzles of a JSONL file (see batch_convert.py, objects of puzzle_generator.py contribute their
+    solution), the problems of lines that cannot be decoded are appended to problems
+    """
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+            if isinstance(value, dict) and "solution" in value:  # output of puzzle_generator.py
+                value = value["solution"]
+            yield puzzle_from_json(value)
+        except ValueError as error:
+            problems.append(f"line {line_number}: {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Store solved Tantrix boards in an SQLite database and query them.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    add_parser = subparsers.add_parser("add", help="Store the solved puzzles of a JSONL file")
+    add_parser.add_argument("input", help="Input file with one puzzle per line, - for stdin")
+    query_parser = subparsers.add_parser("query", help="Print the stored solutions that match all conditions as JSONL")
+    query_parser.add_argument("--tiles", default=None, help="Exactly these tile ids, e.g. \"[0, 1, 2]\"")
+    query_parser.add_argument("--within", default=None,
+                              help="Only tiles with these colors (e.g. BRY) or of this list of tile ids")
+    query_parser.add_argument("--shape", choices=SHAPES[:2], default=None,
+                              help="Shape of the solution (see puzzle_generator.py), needs --count")
+    query_parser.add_argument("--count", type=int, default=None, help="Number of tiles")
+    query_parser.add_argument("--limit", type=int, default=None, help="Maximal number of solutions")
+    for subparser in (add_parser, query_parser):
+        subparser.add_argument("--db", default=DEFAULT_DATABASE, help=f"Database file (default: {DEFAULT_DATABASE})")
+    args = parser.parse_args(argv)
+
+    with SolutionStore(args.db) as store:
+        if args.command == "add":
+            problems = []
+            source = sys.stdin if args.input == "-" else open(args.input)
+            try:
+                added = store.add_solutions(read_solutions(source, problems), problems)
+            finally:
+                if source is not sys.stdin:
+                    source.close()
+            for problem in problems:
+                print(problem, file=sys.stderr)
+            print(f"{added} new solutions stored, {len(problems)} failed, {len(store)} in total", file=sys.stderr)
+            return 1 if problems else 0
+
+        if args.shape and args.count is None:
+            parser.error("--shape needs --count")
+        within = None
+        if args.within:
+            within = get_color_mask(args.within) if args.within.isalpha() else get_tile_mask(json.loads(args.within))
+        shape = get_shape_key(get_shape_fields(args.count, args.shape)) if args.shape else None
+        solutions = store.find_solutions(tiles=json.loads(args.tiles) if args.tiles else None, within=within,
+                                         shape=shape, num_tiles=args.count, limit=args.limit)
+        for solution in solutions:
+            print(json.dumps(solution))
+        print(f"{len(solutions)} solutions found", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,13 @@
 import argparse
 import ast
 import random
-from GUI import solo_tantrix, tantrix_gui
-from hexagon_functions import get_neighbor
 
-gui_codes = solo_tantrix.CODES
-gui_directions = solo_tantrix.DIRECTIONS
+from GUI import tile_codes
+from hexagon_functions import get_coords_list, get_neighbor, get_neighbor_table
+
+# The game (NumPy) and the GUI (tkinter) are imported in main, the conversion functions only need the tile codes
+gui_codes = tile_codes.CODES
+gui_directions = tile_codes.DIRECTIONS
 
 
 def transform_tantrix_puzzle_to_gui_format(puzzle):
@@ -14,59 +16,12 @@ def transform_tantrix_puzzle_to_gui_format(puzzle):
     [[fields], [tiles]],
     [[fields], [tiles], [rotations]] or
     [[fields], [tiles], [tile_codes], [rotations]]
+    into the tile codes and their grid index offsets (see get_grid_offsets)
     """
 
-    def rotate_gui_format(tile, rotation):
-        """Generate GUI format of tile by shifting string"""
-        new_tile = ''.join([tile[i] for i in [(i + rotation * 5) % 6 for i in [*range(6)]]])
-        return new_tile
-
-    def get_path_for_ascending_field_enumeration(puzzle_length):
-        """Get a hamiltonian path through the fields (see README for enumeration)"""
-        current_field = 0
-        search_direction = 1
-        visited_fields = 1
-        path_edg = []
-        while visited_fields < puzzle_length:
-            for edge in range(6):
-                nbg = get_neighbor(current_field, edge)
-                if nbg == current_field + search_direction * 1:
-                    path_edg.append(edge)
-                    current_field = nbg
-                    visited_fields += 1
-                    break
-                if edge == 5:  # if next field is not in neighborhood of current_field, move down and change search dir.
-                    search_direction = -1 * search_direction  # invert the search direction
-                    path_edg.append(0)
-                    current_field = get_neighbor(current_field, edge=0)
-                    visited_fields += 1
-        print(path_edg)
-        return get_gui_directions_from_path_edges(path_edg)
-
-    path_edges = None
-    if len(puzzle) == 1:  # [[tiles]]
-        # puzzle.insert(0, [*range(len(puzzle[0]))])  # add fields if only [[tiles]] as input
-        out_puzzle = [gui_codes[tile] for tile in puzzle[0]]
-        path_edges = get_path_for_ascending_field_enumeration(len(puzzle[0]))
-    else:
-        if len(puzzle) == 2:  # [[fields], [tiles]]
-            out_tiles = [gui_codes[tile] for tile in puzzle[1]]
-        else:
-            if type(puzzle[1][0]) == str:
-                puzzle.insert(0, [*range(len(puzzle[0]))])
-            out_tiles = [rotate_gui_format(gui_codes[tile],
-                                           rotation=puzzle[-1][idx]) for idx, tile in enumerate(puzzle[1])]
-        fields = puzzle[0]
-        graph = create_graph(fields)
-        field_permutation = get_hamiltonian_path(fields, graph)
-        # print(f"{field_permutation=}")
-        # print(f"{out_tiles=}")
-        if field_permutation is not None:
-            out_puzzle = [out_tiles[fields.index(perm_tile)] for perm_tile in field_permutation]
-            path_edges = get_path_edges(field_permutation)
-        else:
-            out_puzzle = out_tiles
-    return [out_puzzle, path_edges]
+    fields, tiles, rotations = split_puzzle(puzzle)
+    out_puzzle = tile_codes.decode_board(tiles, rotations)
+    return [out_puzzle, get_grid_offsets(fields)]
 
 
 def transform_gui_puzzle_to_tantrix_format(tile_value):
@@ -74,18 +29,6 @@ def transform_gui_puzzle_to_tantrix_format(tile_value):
     Reformat puzzle from gui format: {(2, 1, 3): 'YBYRRB', (1, 2, 3): 'GBRRGB', (1, 3, 2): 'RBGGRB'}
     into [[fields], [tiles], [rotations]]
     """
-#
-    def check_tile(tile):
-        """Check which tile in solitaire_codes matches the rotated tile and return the rotation"""
-        # new_tile = tile
-        for idx in range(6):  # rotate tile until it matches
-            new_tile = ''.join([tile[i] for i in [(i - idx * 5) % 6 for i in [*range(6)]]])
-            if new_tile in gui_codes:
-                return gui_codes.index(new_tile), idx  # return the tile number and the rotation
-#
-    fields = []
-    tiles = []
-    rotations = []
 #
     visited_pieces = 1
     field_index = 0
@@ -114,24 +57,25 @@ def transform_gui_puzzle_to_tantrix_format(tile_value):
                 # print("failing at edge 5")
                 # Invert search direction, see enumeration of board in README (index 7 is not a neighbor of index 6)
                 search_direction = -1 * search_direction
-                field_index = get_neighbor(field_index, edge=0)
+                field_index = get_neighbor(field_index, 0)
                 gui_dir = get_gui_directions_from_path_edges(trans_edges=[0])
                 current_tile = tuple([current_tile[idx] + gui_directions[gui_dir[0]][idx] for idx in range(3)])
                 if current_tile in tile_value.keys():
                     field_and_grid_indices.append((field_index, tuple(current_tile)))
                     visited_pieces += 1
 #
-    for fidx, grid_idx in field_and_grid_indices:  # generate the output
-        grid_code = tile_value[grid_idx]
-        tantrix_num, rot = check_tile(grid_code)
-        fields.append(fidx)
-        tiles.append(tantrix_num)
-        rotations.append(rot)
-#
-    print(f"[{fields}, {tiles}, {rotations}]")
+    # generate the output, the codes are looked up in the table of all rotated codes
+    fields = [fidx for fidx, _ in field_and_grid_indices]
+    tiles, rotations = tile_codes.encode_board(tile_value[grid_idx] for _, grid_idx in field_and_grid_indices)
     return [fields, tiles, rotations]
 
 
+def print_tantrix_format(tile_value):
+    """Print the board of the GUI ('Print Puzzle' button) as [[fields], [tiles], [rotations]]"""
+    fields, tiles, rotations = transform_gui_puzzle_to_tantrix_format(tile_value)
+    print(f"[{fields}, {tiles}, {rotations}]")
+
+
 def find_path(graph, start, visited, path):
     """Find a path through the graph defined by the get_neighbor-function between the fields of the solution"""
     visited.add(start)
@@ -167,33 +111,42 @@ def get_gui_directions_from_path_edges(trans_edges):
 
 def get_path_edges(ham_path):
     """Get the transitioning edges of the tiles on the hamiltonian path"""
+    neighbor_table = get_neighbor_table(max(ham_path) + 1)
     transition_edges = []
     for index, field in enumerate(ham_path[:-1]):
         for edge in range(6):
-            if get_neighbor(field, edge) == ham_path[index + 1]:
+            if neighbor_table[field, edge] == ham_path[index + 1]:
                 transition_edges.append(edge)
                 break
     return get_gui_directions_from_path_edges(transition_edges)
 
 
-def calculate_puzzle_expansion(transition_directions):
+def get_grid_offsets(fields):
+    """
+    Map the fields (see field enumeration in README) directly onto GUI grid index offsets (h, k, l) relative to the
+    first field. A step along field edge e (see hexagon_functions.EDGE_STEPS) is a step in GUI direction
+    get_gui_directions_from_path_edges([e]), which makes the mapping of the hexagon coordinates (x, y) linear:
+    (h, k, l) = (y, -x, x - y)
+    """
+    coords = get_coords_list(fields)
+    start_x, start_y = coords[0]
+    return [(_y - start_y, start_x - _x, (_x - start_x) - (_y - start_y)) for _x, _y in coords]
+
+
+def calculate_puzzle_expansion(tile_offsets):
     """
     Calculates the maximum and minimum extension of the puzzle along the three axes.
-    :param transition_directions: List of directions to transition through.
+    :param tile_offsets: Grid index offsets of the tiles (see get_grid_offsets).
     :return: List of minimum and maximum extensions along each axis.
     """
-    if transition_directions is None:  # if puzzle tiles are not contiguous or form is not allowed
-        # (i.e. puzzles with more than one tile that is only connected on one edge to the rest of the puzzle)
+    if tile_offsets is None:
         return None
     puzzle_expansion = [[0, 0], [0, 0], [0, 0]]  # [min, max] extension of puzzle in three axes
-    cursor = [0, 0, 0]
-    for direction in transition_directions:
-        # Move the cursor according to the direction
-        cursor = [cursor[idx] + gui_directions[direction][idx] for idx in range(3)]
+    for offset in tile_offsets:
         # Update the puzzle extension for each axis
         for axis in range(3):
-            puzzle_expansion[axis][0] = min(cursor[axis], puzzle_expansion[axis][0])
-            puzzle_expansion[axis][1] = max(cursor[axis], puzzle_expansion[axis][1])
+            puzzle_expansion[axis][0] = min(offset[axis], puzzle_expansion[axis][0])
+            puzzle_expansion[axis][1] = max(offset[axis], puzzle_expansion[axis][1])
     return puzzle_expansion
 
 
@@ -228,12 +181,14 @@ def get_valid_gui_start_point(tiling_size, puzzle_exp):
     return valid_points[0]  # Return the most balanced point
 
 
-def get_board_size(puzzle_size):
-    """Get the size (triangle side length) of the GUI game board"""
+def get_board_size(puzzle_size, puzzle_exp=None):
+    """Get the size (triangle side length) of the GUI game board, large enough for the puzzle expansion if given"""
     pyramid_size = 0  # side length of the pyramid with all puzzle pieces included
     while (pyramid_size + 1) * pyramid_size // 2 < puzzle_size:
         pyramid_size += 1
     board_size = pyramid_size + 2
+    if puzzle_exp is not None:  # the start point needs h, k, l >= -(minimum extension) on every axis
+        board_size = max(board_size, -sum(axis_exp[0] for axis_exp in puzzle_exp))
     return board_size
 
 
@@ -246,16 +201,35 @@ def create_graph(fields):
                         10: [2, 3] }
             for the fields [0, 1, 2, 3, 10], see field enumeration in README
     """
+    neighbor_table = get_neighbor_table(max(fields) + 1)
     graph = {}
     for field in fields:
         # Für jede Zelle alle 6 Nachbarn berechnen
-        neighbors = [get_neighbor(field, edge) for edge in range(6)]
+        neighbors = neighbor_table[field].tolist()
         neighbors = [nbg for nbg in neighbors if nbg in fields]
         # In den Graphen eintragen
         graph[field] = neighbors
     return graph
 
 
+def get_puzzle_neighbors(fields):
+    """
+    Get the neighbor table of the fields of a puzzle as array of shape (len(fields), 6) in the order of the GUI
+    DIRECTIONS, entry [idx, direction] is the position of the neighboring field in fields or -1 if there is none.
+    Used to score puzzles in the [[fields], [tiles], [rotations]] format with solo_tantrix.batch_mismatches
+    """
+    import numpy as np
+
+    neighbor_table = get_neighbor_table(max(fields) + 1)
+    field_positions = {field: idx for idx, field in enumerate(fields)}
+    directions = get_gui_directions_from_path_edges([*range(6)])
+    neighbors = np.full((len(fields), 6), -1, dtype=np.int64)
+    for idx, field in enumerate(fields):
+        for edge, nbg in enumerate(neighbor_table[field].tolist()):
+            neighbors[idx, directions[edge]] = field_positions.get(nbg, -1)
+    return neighbors
+
+
 def parse_sol(solution):
     """Try to read input and convert it to solution"""
     output = None
@@ -268,6 +242,26 @@ def parse_sol(solution):
     return output
 
 
+def split_puzzle(puzzle):
+    """
+    Get the fields, tiles and rotations of a puzzle of the form
+    [[tiles]],
+    [[fields], [tiles]],
+    [[fields], [tiles], [rotations]],
+    [[fields], [tiles], [tile_codes], [rotations]] or
+    [[tiles], [tile_codes], [rotations]] (flower puzzle),
+    missing fields are enumerated ascending and missing rotations are 0
+    """
+    if len(puzzle) == 1:  # [[tiles]]
+        tiles = list(puzzle[0])
+        return [*range(len(tiles))], tiles, [0] * len(tiles)
+    if len(puzzle) == 2:  # [[fields], [tiles]]
+        return list(puzzle[0]), list(puzzle[1]), [0] * len(puzzle[1])
+    if len(puzzle) == 3 and isinstance(puzzle[1][0], str):  # flower puzzle without fields
+        return [*range(len(puzzle[0]))], list(puzzle[0]), list(puzzle[2])
+    return list(puzzle[0]), list(puzzle[1]), list(puzzle[-1])
+
+
 def gen_random_sol(n_tiles=7, kangaroo=1, sample=0, ascending=0, randomness=0, standard=0):
     """
     Function to randomly generate a general solution with a variable number of tiles.
@@ -329,32 +323,136 @@ def main():
         required=False
     )
 
+    # Add arguments to start a puzzle of a binary puzzle library (see puzzle_library.py)
+    parser.add_argument(
+        "--library",
+        type=str,
+        default=None,
+        help="Puzzle library file (see puzzle_library.py), the puzzle is read from it instead of -p"
+    )
+    parser.add_argument(
+        "--index",
+        type=int,
+        default=0,
+        help="Number of the puzzle in the library (default: 0)"
+    )
+
+    # Add arguments for the simulated annealing solver
+    parser.add_argument(
+        "--solve",
+        action="store_true",
+        help="Solve the puzzle with simulated annealing before starting the game and print the solution"
+    )
+    parser.add_argument(
+        "--steps",
+        type=int,
+        default=None,
+        help="Number of simulated annealing steps for --solve and the 'Solve' button, with --parallel per replica or "
+             "restart (default: 200000, for --parallel tempering 200 rounds of 5000 steps)"
+    )
+    parser.add_argument(
+        "--parallel",
+        choices=["tempering", "restarts"],
+        default=None,
+        help="Solve on all cores, either with parallel tempering or with independent restarts (use with --solve)"
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=None,
+        help="Number of worker processes for --parallel (default: number of cores)"
+    )
+
+    # Add argument for the solution store (see solution_store.py)
+    parser.add_argument(
+        "--store",
+        type=str,
+        default=None,
+        help="SQLite solution store (see solution_store.py), solved boards printed with 'Print Puzzle' are saved and "
+             "'Load Solution' places a stored solution of the tiles onto the board"
+    )
+
+    # Add arguments for the timing statistics of the GUI
+    parser.add_argument(
+        "--stats",
+        type=str,
+        default=None,
+        help="Record the latencies of the GUI interactions and write them as JSON to this file on exit"
+    )
+    parser.add_argument(
+        "--show-stats",
+        action="store_true",
+        help="Show the latencies of the GUI interactions in an overlay on the board (toggle with key 'o')"
+    )
+
     # Parse arguments
     args = parser.parse_args()
 
     # Try to read input puzzle
-    if parse_sol(args.puzzle) is not None:
+    if args.library:
+        import puzzle_library
+        try:
+            with puzzle_library.PuzzleLibrary(args.library) as library:
+                puzzle = library[args.index]
+        except (OSError, ValueError, IndexError) as error:
+            parser.error(f"--library: {error}")
+    elif parse_sol(args.puzzle) is not None:
         puzzle = parse_sol(args.puzzle)
 
     # Retrieve the puzzle from input
     # puzzle = args.puzzle
 
+    def solve_board(game):
+        """Solve the board of the GUI in place with simulated annealing, in chunks run from the event loop"""
+        import annealing
+        return annealing.iter_anneal_board(game, steps=annealing.STEPS if args.steps is None else args.steps)
+
+    if args.solve:
+        import annealing
+        if args.parallel:
+            puzzle, mismatches = annealing.parallel_anneal_puzzle(puzzle, mode=args.parallel, steps=args.steps,
+                                                                  processes=args.processes)
+        else:
+            puzzle, mismatches = annealing.anneal_puzzle(puzzle,
+                                                         steps=annealing.STEPS if args.steps is None else args.steps)
+        print(f"Solution with {mismatches} errors: {puzzle}")
+
     # Transform user input puzzle to GUI puzzle format
-    gui_puzzle, transition_edges = transform_tantrix_puzzle_to_gui_format(puzzle)
-    # print(f"{gui_puzzle=} \n {transition_edges=}")
+    gui_puzzle, tile_offsets = transform_tantrix_puzzle_to_gui_format(puzzle)
+    # print(f"{gui_puzzle=} \n {tile_offsets=}")
 
-    puzzle_expansion = calculate_puzzle_expansion(transition_edges)
+    puzzle_expansion = calculate_puzzle_expansion(tile_offsets)
     # print(f"{puzzle_expansion=}")
 
-    board_size = get_board_size(len(gui_puzzle))
+    board_size = get_board_size(len(gui_puzzle), puzzle_expansion)
     print(f"{board_size=}")
 
     start_hexagon = get_valid_gui_start_point(tiling_size=board_size, puzzle_exp=puzzle_expansion)
     # print(f"{start_hexagon=}")
 
+    print_callback, load_callback = print_tantrix_format, None
+    if args.store:
+        import solution_store
+        store = solution_store.SolutionStore(args.store)
+
+        def print_callback(tile_value):
+            """Print the board and save it in the solution store if it is solved"""
+            print_tantrix_format(tile_value)
+            try:
+                if store.add_solution(tile_value):
+                    print(f"Solution saved in {args.store}")
+            except ValueError:  # not solved
+                pass
+
+        def load_callback(game):
+            """Place a stored solution of the tiles onto the board"""
+            return solution_store.load_solution(game, store)
+
     # Initialize and start the game with the given puzzle
-    tantrix_gui.TantrixGUI(solo_tantrix.Tantrix(gui_puzzle, board_size, start_hexagon, transition_edges),
-                           transform_gui_puzzle_to_tantrix_format)
+    from GUI import solo_tantrix, tantrix_gui
+    tantrix_gui.TantrixGUI(solo_tantrix.Tantrix(gui_puzzle, board_size, start_hexagon, tile_offsets),
+                           print_callback, solve_callback=solve_board, stats_file=args.stats,
+                           show_stats=args.show_stats, load_callback=load_callback)
 
 
 if __name__ == "__main__":
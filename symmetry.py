@@ -0,0 +1,169 @@
+"""
+Canonical form of Tantrix arrangements under the symmetries of the hexagonal grid
+
+An arrangement is a set of cells (h, k, l) with a tile code each (see GUI.tile_codes). Two arrangements are the same
+if they differ only by a translation (Tantrix.try_board_shift), by one of the six rotations of the board or by a
+reflection. A 60 degree rotation maps the cell (h, k, l) onto (-l, -h, -k) and direction d onto d + 1, so every code
+is rotated clockwise once; the reflection swaps h and k and maps direction d onto 5 - d, which reverses the codes.
+The canonical key is the smallest of the twelve transformed, translated and sorted arrangements, so it is equal for
+all symmetric arrangements and can be used to deduplicate solutions and puzzle corpora. A reversed code is in general
+the code of another tile (the mirror tile), so a mirrored canonical form may use other tile ids than the arrangement;
+with mirror=False only translations and rotations are used and the tile ids are kept:
+
+python symmetry.py puzzles.jsonl -o unique.jsonl   # --mirror also removes mirror images
+"""
+import argparse
+import json
+import sys
+
+from batch_convert import puzzle_from_json
+from GUI.tile_codes import decode_board, encode_board
+from hexagon_functions import get_pos_from_coords
+from start_game import get_grid_offsets, split_puzzle
+
+NUM_ROTATIONS = 6
+
+
+def rotate_cell(cell):
+    """Rotate a cell (h, k, l) by 60 degrees clockwise around the origin"""
+    return -cell[2], -cell[0], -cell[1]
+
+
+def mirror_cell(cell):
+    """Reflect a cell (h, k, l) at the axis h = k"""
+    return cell[1], cell[0], cell[2]
+
+
+def rotate_code(code):
+    """Tile code after rotating the board by 60 degrees clockwise"""
+    return code[-1:] + code[:-1]
+
+
+def mirror_code(code):
+    """Tile code after reflecting the board (see mirror_cell)"""
+    return code[::-1]
+
+
+def get_cells(arrangement):
+    """
+    Cells and codes [((h, k, l), code), ...] of a Tantrix game, of a GUI format puzzle {(h, k, l): code} or of a
+    puzzle in one of the formats of start_game.py (see README)
+    """
+    if hasattr(arrangement, "get_tile_value"):  # Tantrix game
+        arrangement = arrangement.get_tile_value()
+    if isinstance(arrangement, dict):
+        return [(tuple(grid_index), code) for grid_index, code in arrangement.items()]
+    fields, tiles, rotations = split_puzzle(arrangement)
+    return [*zip(map(tuple, get_grid_offsets(fields)), decode_board(tiles, rotations))]
+
+
+def get_symmetric_cells(cells, mirror=True):
+    """
+    Generate the cells of all twelve symmetric arrangements (only the six rotations if mirror is false), each
+    translated so that its smallest cell is (0, 0, 0) and sorted
+    """
+    for mirrored in (False, True) if mirror else (False,):
+        transformed = [(mirror_cell(cell), mirror_code(code)) if mirrored else (cell, code) for cell, code in cells]
+        for _ in range(NUM_ROTATIONS):
+            origin = min(cell for cell, _ in transformed)
+            yield sorted((tuple(cell[dim] - origin[dim] for dim in range(3)), code) for cell, code in transformed)
+            transformed = [(rotate_cell(cell), rotate_code(code)) for cell, code in transformed]
+
+
+def cells_to_key(cells):
+    """String key of sorted cells, 'h,k,l:code;...'"""
+    return ";".join(f"{cell[0]},{cell[1]},{cell[2]}:{code}" for cell, code in cells)
+
+
+def get_canonical_cells(arrangement, mirror=True):
+    """
+    Canonical cells and codes of an arrangement (see get_cells), equal for all symmetric arrangements (for all
+    translated and rotated arrangements if mirror is false)
+    """
+    return min(get_symmetric_cells(get_cells(arrangement), mirror), key=cells_to_key)
+
+
+def get_canonical_key(arrangement, mirror=True):
+    """
+    Canonical key of an arrangement (see get_cells) as string, equal for all symmetric arrangements (for all
+    translated and rotated arrangements if mirror is false)
+    """
+    return cells_to_key(get_canonical_cells(arrangement, mirror))
+
+
+def get_shape_key(arrangement):
+    """
+    Canonical key of the shape of an arrangement (see get_cells) or of a list of fields, independent of the tiles
+    """
+    if isinstance(arrangement, list) and all(isinstance(field, int) for field in arrangement):
+        arrangement = [arrangement, [0] * len(arrangement)]  # fields only, any tile id
+    cells = [(cell, "") for cell, _ in get_cells(arrangement)]
+    return min(";".join(f"{cell[0]},{cell[1]},{cell[2]}" for cell, _ in symmetric)
+               for symmetric in get_symmetric_cells(cells))
+
+
+def get_canonical_puzzle(arrangement, mirror=True):
+    """
+    Canonical form of an arrangement (see get_cells) as [[fields], [tiles], [rotations]], the smallest cell of the
+    canonical cells lies on field 0. If the canonical form is a mirror image, its tiles are the mirror tiles of the
+    arrangement (reversed codes), with mirror=False only translations and rotations are used and the tile ids are kept
+    """
+    cells = get_canonical_cells(arrangement, mirror)
+    # inverse of get_grid_offsets, (h, k, l) = (y, -x, x - y)
+    fields = [get_pos_from_coords((-k, h)) for (h, k, _), _ in cells]
+    tiles, rotations = encode_board(code for _, code in cells)
+    return [fields, tiles, rotations]
+
+
+def deduplicate(arrangements, mirror=False):
+    """
+    Generate the arrangements whose canonical key was not seen before, mirror images only count as duplicates if
+    mirror is true (they consist of the mirror tiles, see get_canonical_puzzle)
+    """
+    seen = set()
+    for arrangement in arrangements:
+        key = get_canonical_key(arrangement, mirror)
+        if key not in seen:
+            seen.add(key)
+            yield arrangement
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Remove symmetric duplicates from a JSONL file of Tantrix puzzles.")
+    parser.add_argument("input", help="Input file with one puzzle per line (see batch_convert.py or "
+                                      "puzzle_generator.py, objects are compared by their solution), - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="Output file, - for stdout (default)")
+    parser.add_argument("--mirror", action=argparse.BooleanOptionalAction, default=False,
+                        help="Also remove mirror images, which consist of other tiles (default: --no-mirror, only "
+                             "translated and rotated copies are removed)")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == "-" else open(args.input)
+    target = sys.stdout if args.output == "-" else open(args.output, "w")
+    seen = set()
+    lines = duplicates = 0
+    try:
+        for line in source:
+            if not line.strip():
+                continue
+            value = json.loads(line)
+            if isinstance(value, dict) and "solution" in value:  # output of puzzle_generator.py
+                value = value["solution"]
+            key = get_canonical_key(puzzle_from_json(value), args.mirror)
+            lines += 1
+            if key in seen:
+                duplicates += 1
+                continue
+            seen.add(key)
+            target.write(line if line.endswith("\n") else line + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    print(f"{lines - duplicates} unique of {lines} puzzles", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
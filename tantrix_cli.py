@@ -0,0 +1,202 @@
+"""
+Headless command line tools for Tantrix puzzles
+
+Converts, validates, scrambles and scores puzzles without the GUI. Only the tile tables and the closed form hexagon
+functions are loaded, neither tkinter nor NumPy is imported, so that many short calls start fast on servers without
+display. Puzzles are read in the formats of start_game.py (see README) or in the GUI format printed by the game
+{(h, k, l): 'code', ...}, for example:
+
+python tantrix_cli.py convert "[[0, 1, 2], [3, 7, 12], [0, 5, 1]]"
+python tantrix_cli.py score "[[0, 1, 2], [3, 7, 12], [0, 5, 1]]"
+"""
+import argparse
+import ast
+import random
+import sys
+
+from GUI.tile_codes import CODE_INDEX, CODES, DIRECTIONS, ROTATED_CODES, decode_board, reverse_direction
+from hexagon_functions import get_neighbor
+from start_game import (calculate_puzzle_expansion, get_board_size, get_gui_directions_from_path_edges,
+                        get_valid_gui_start_point, split_puzzle, transform_gui_puzzle_to_tantrix_format,
+                        transform_tantrix_puzzle_to_gui_format)
+
+# GUI direction of every field edge (see get_gui_directions_from_path_edges)
+EDGE_DIRECTIONS = get_gui_directions_from_path_edges([*range(6)])
+
+
+def read_puzzle(text):
+    """Read a puzzle from its string representation, raise ValueError if it is not a Python literal"""
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError) as error:
+        raise ValueError(f"invalid puzzle format: {text!r}") from error
+
+
+def is_gui_format(puzzle):
+    """Check whether the puzzle is in the GUI format {(h, k, l): 'code', ...}"""
+    return isinstance(puzzle, dict)
+
+
+def to_gui_format(puzzle):
+    """Place a puzzle of the start_game formats onto a board like start_game.py does and return {(h, k, l): code}"""
+    gui_puzzle, tile_offsets = transform_tantrix_puzzle_to_gui_format(puzzle)
+    puzzle_expansion = calculate_puzzle_expansion(tile_offsets)
+    board_size = get_board_size(len(gui_puzzle), puzzle_expansion)
+    start_hexagon = get_valid_gui_start_point(tiling_size=board_size, puzzle_exp=puzzle_expansion)
+    return {tuple(start_hexagon[dim] + offset[dim] for dim in range(3)): code
+            for code, offset in zip(gui_puzzle, tile_offsets)}
+
+
+def convert_puzzle(puzzle):
+    """Convert a GUI format puzzle to [[fields], [tiles], [rotations]] and every other format to the GUI format"""
+    if is_gui_format(puzzle):
+        return transform_gui_puzzle_to_tantrix_format(puzzle)
+    return to_gui_format(puzzle)
+
+
+def validate_puzzle(puzzle):
+    """Return the list of problems of a puzzle, the puzzle is valid if the list is empty"""
+    if is_gui_format(puzzle):
+        return validate_gui_puzzle(puzzle)
+    try:
+        fields, tiles, rotations = split_puzzle(puzzle)
+    except (TypeError, IndexError, KeyError):
+        return ["puzzle has none of the formats [[tiles]], [[fields], [tiles]], [[fields], [tiles], [rotations]], "
+                "[[fields], [tiles], [tile_codes], [rotations]] or [[tiles], [tile_codes], [rotations]]"]
+    if not tiles:
+        return ["puzzle has no tiles"]
+    problems = []
+    if not len(fields) == len(tiles) == len(rotations):
+        problems.append(f"{len(fields)} fields, {len(tiles)} tiles and {len(rotations)} rotations")
+    if any(not isinstance(tile, int) or not 0 <= tile < len(CODES) for tile in tiles):
+        problems.append(f"tile ids must be in 0..{len(CODES) - 1}")
+    elif len(set(tiles)) != len(tiles):
+        problems.append("tiles are used more than once")
+    if any(not isinstance(rotation, int) or not 0 <= rotation < 6 for rotation in rotations):
+        problems.append("rotations must be in 0..5")
+    if any(not isinstance(field, int) or field < 0 for field in fields):
+        problems.append("fields must be non-negative integers")
+    elif len(set(fields)) != len(fields):
+        problems.append("fields are used more than once")
+    elif not is_connected(fields, lambda field: [get_neighbor(field, edge) for edge in range(6)]):
+        problems.append("fields are not connected")
+    return problems
+
+
+def validate_gui_puzzle(tile_value):
+    """Return the list of problems of a GUI format puzzle {(h, k, l): 'code', ...}"""
+    if not tile_value:
+        return ["puzzle has no tiles"]
+    problems = []
+    if any(not isinstance(grid_index, tuple) or len(grid_index) != 3 for grid_index in tile_value):
+        return ["grid indices must be tuples (h, k, l)"]
+    if len({sum(grid_index) for grid_index in tile_value}) != 1:
+        problems.append("grid indices (h, k, l) must have the same sum h + k + l")
+    if any(code not in CODE_INDEX for code in tile_value.values()):
+        problems.append("unknown tile codes")
+    elif len({CODE_INDEX[code][0] for code in tile_value.values()}) != len(tile_value):
+        problems.append("tiles are used more than once")
+    elif not problems and not is_connected(list(tile_value), get_grid_neighbors):
+        problems.append("tiles are not connected")
+    return problems
+
+
+def get_grid_neighbors(grid_index):
+    """Grid indices of the six neighbors of a cell in DIRECTIONS order"""
+    return [tuple(grid_index[dim] + step[dim] for dim in range(3)) for step in DIRECTIONS.values()]
+
+
+def is_connected(cells, neighbors):
+    """Check whether all cells can be reached from the first one, neighbors(cell) returns the adjacent cells"""
+    cell_set = set(cells)
+    visited = {cells[0]}
+    stack = [cells[0]]
+    while stack:
+        for neighbor in neighbors(stack.pop()):
+            if neighbor in cell_set and neighbor not in visited:
+                visited.add(neighbor)
+                stack.append(neighbor)
+    return len(visited) == len(cell_set)
+
+
+def scramble_puzzle(puzzle, seed=None):
+    """
+    Shuffle the tiles of a puzzle over its fields and rotate them randomly, returns [[fields], [tiles], [rotations]]
+    or the GUI format for a GUI format puzzle
+    """
+    rng = random.Random(seed)
+    if is_gui_format(puzzle):
+        codes = list(puzzle.values())
+        rng.shuffle(codes)
+        return {grid_index: ROTATED_CODES[CODE_INDEX[code][0]][rng.randrange(6)]
+                for grid_index, code in zip(puzzle, codes)}
+    fields, tiles, _ = split_puzzle(puzzle)
+    tiles = list(tiles)
+    rng.shuffle(tiles)
+    return [fields, tiles, [rng.randrange(6) for _ in tiles]]
+
+
+def score_puzzle(puzzle):
+    """Count the adjacent edges with different colors, 0 for a solved puzzle"""
+    if is_gui_format(puzzle):
+        mismatches = 0
+        for grid_index, code in puzzle.items():
+            for direction, neighbor in enumerate(get_grid_neighbors(grid_index)):
+                if neighbor > grid_index and neighbor in puzzle and \
+                        code[direction] != puzzle[neighbor][reverse_direction(direction)]:
+                    mismatches += 1
+        return mismatches
+    fields, tiles, rotations = split_puzzle(puzzle)
+    field_positions = {field: idx for idx, field in enumerate(fields)}
+    codes = decode_board(tiles, rotations)
+    mismatches = 0
+    for idx, field in enumerate(fields):
+        for edge, direction in enumerate(EDGE_DIRECTIONS):
+            nbr = field_positions.get(get_neighbor(field, edge), -1)
+            if nbr > idx and codes[idx][direction] != codes[nbr][reverse_direction(direction)]:
+                mismatches += 1
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert, validate, scramble and score Tantrix puzzles without GUI.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("convert", help="Convert between [[fields], [tiles], [rotations]] and the GUI format "
+                                          "{(h, k, l): 'code'}").add_argument("puzzle")
+    subparsers.add_parser("validate", help="Check tile ids, rotations and fields, exit code 1 if the puzzle is "
+                                           "invalid").add_argument("puzzle")
+    scramble_parser = subparsers.add_parser("scramble", help="Shuffle and rotate the tiles of a puzzle randomly")
+    scramble_parser.add_argument("puzzle")
+    scramble_parser.add_argument("--seed", type=int, default=None, help="Seed of the random generator")
+    score_parser = subparsers.add_parser("score", help="Print the number of mismatching edges")
+    score_parser.add_argument("puzzle")
+    score_parser.add_argument("--check", action="store_true", help="Exit code 1 if the puzzle is not solved")
+    args = parser.parse_args(argv)
+
+    try:
+        puzzle = read_puzzle(args.puzzle)
+    except ValueError as error:
+        parser.error(str(error))
+    problems = validate_puzzle(puzzle)
+    if args.command == "validate":
+        for problem in problems:
+            print(problem)
+        print("valid" if not problems else "invalid")
+        return 1 if problems else 0
+    if problems:
+        parser.error("; ".join(problems))
+
+    if args.command == "convert":
+        print(convert_puzzle(puzzle))
+    elif args.command == "scramble":
+        print(scramble_puzzle(puzzle, seed=args.seed))
+    else:
+        mismatches = score_puzzle(puzzle)
+        print(mismatches)
+        if args.check and mismatches:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""
+The exact solver compared with a brute force search over all arrangements of a few tiles
+
+python -m unittest discover tests
+"""
+import itertools
+import random
+import unittest
+
+import numpy as np
+
+import exact_solver
+import puzzle_generator
+from GUI.solo_tantrix import batch_mismatches
+from start_game import get_puzzle_neighbors
+
+
+def brute_force(tiles, neighbors):
+    """All (tile ids per cell, rotations per cell) without mismatching edges, every permutation and rotation tried"""
+    arrangements = [(order, rotations) for order in itertools.permutations(tiles)
+                    for rotations in itertools.product(range(6), repeat=len(tiles))]
+    mismatches = batch_mismatches(np.array([order for order, _ in arrangements]),
+                                  np.array([rotations for _, rotations in arrangements]), neighbors)
+    return {arrangement for arrangement, count in zip(arrangements, mismatches.tolist()) if count == 0}
+
+
+class ExactSolver(unittest.TestCase):
+
+    def test_brute_force(self):
+        rng = random.Random(4)
+        solved = 0
+        # three fields around a corner, a row of three and four fields in a rhombus
+        for fields in ([0, 1, 2], [0, 1, 7], [0, 1, 2, 3]):
+            neighbors = get_puzzle_neighbors(fields)
+            for _ in range(8 if len(fields) == 3 else 3):
+                tiles = rng.sample(range(56), len(fields))
+                with self.subTest(fields=fields, tiles=tiles):
+                    expected = brute_force(tiles, neighbors)
+                    found = exact_solver.solve_exact(tiles, neighbors)
+                    self.assertEqual(len(found), len(expected))  # no solution is found twice
+                    self.assertEqual({(tuple(order), tuple(rotations)) for order, rotations in found}, expected)
+                    solved += bool(expected)
+        self.assertGreater(solved, 0)
+
+    def test_max_solutions(self):
+        neighbors = get_puzzle_neighbors([0, 1, 2])
+        self.assertEqual(len(exact_solver.solve_exact([0, 1, 2], neighbors, max_solutions=1)), 1)
+
+    def test_generated_puzzle(self):
+        puzzle, solution = puzzle_generator.generate_puzzle(10, "pyramid", seed=3)
+        solutions = exact_solver.solve_puzzle_exact(puzzle, max_solutions=5)
+        self.assertTrue(solutions)
+        for fields, tiles, rotations in solutions:
+            self.assertEqual(fields, solution[0])
+            self.assertEqual(sorted(tiles), sorted(solution[1]))
+            self.assertEqual(batch_mismatches([tiles], [rotations], get_puzzle_neighbors(fields)).tolist(), [0])
+
+    def test_tile_count(self):
+        with self.assertRaises(ValueError):
+            exact_solver.solve_exact([0, 1], get_puzzle_neighbors([0, 1, 2]))
+
+
+if __name__ == "__main__":
+    unittest.main()
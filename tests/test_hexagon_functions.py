@@ -0,0 +1,76 @@
+"""
+The closed forms of the field numbering compared with walking the rings field by field
+
+python -m unittest discover tests
+"""
+import unittest
+
+import numpy as np
+
+import hexagon_functions
+
+RADIUS = 9
+
+
+def walk_rings(radius):
+    """
+    Coordinates of the fields 0, 1, 2, ... up to ring radius: the center, then every ring starting at its bottom left
+    corner (-ring, -ring) with ring steps along each of its six sides, counterclockwise
+    """
+    coords = [(0, 0)]
+    for ring in range(1, radius + 1):
+        x, y = -ring, -ring
+        for step_x, step_y in ((1, 0), (1, 1), (0, 1), (-1, 0), (-1, -1), (0, -1)):
+            for _ in range(ring):
+                coords.append((x, y))
+                x, y = x + step_x, y + step_y
+    return coords
+
+
+class FieldNumbering(unittest.TestCase):
+
+    def setUp(self):
+        self.coords = walk_rings(RADIUS)
+        self.positions = {field_coords: pos for pos, field_coords in enumerate(self.coords)}
+
+    def test_field_count(self):
+        self.assertEqual(len(self.coords), hexagon_functions.get_field_count(RADIUS))
+        self.assertEqual(len(self.positions), len(self.coords))  # no field is visited twice
+
+    def test_single_fields(self):
+        for pos, (x, y) in enumerate(self.coords):
+            with self.subTest(pos=pos):
+                self.assertEqual(tuple(hexagon_functions.get_coords_from_pos(pos).tolist()), (x, y))
+                self.assertEqual(hexagon_functions.get_pos_from_coords(np.array([x, y])), pos)
+                self.assertEqual(hexagon_functions.get_ring(pos), max(abs(x), abs(y), abs(x - y)))
+
+    def test_vectorized(self):
+        positions = np.arange(len(self.coords))
+        self.assertEqual([tuple(row) for row in hexagon_functions.get_coords_from_positions(positions).tolist()],
+                         self.coords)
+        self.assertEqual(hexagon_functions.get_coords_list(positions), self.coords)
+        self.assertEqual(hexagon_functions.get_positions_from_coords(np.array(self.coords)).tolist(),
+                         positions.tolist())
+        # any shape of the input is kept
+        grid = positions[:60].reshape(3, 4, 5)
+        self.assertEqual(hexagon_functions.get_positions_from_coords(
+            hexagon_functions.get_coords_from_positions(grid)).tolist(), grid.tolist())
+
+    def test_neighbor_table(self):
+        table = hexagon_functions.build_neighbor_table(RADIUS - 1)  # the neighbors of the outer ring are in RADIUS
+        self.assertEqual(table.shape, (hexagon_functions.get_field_count(RADIUS - 1), 6))
+        for pos, (x, y) in enumerate(self.coords[:len(table)]):
+            expected = [self.positions[x + step_x, y + step_y] for step_x, step_y in hexagon_functions.EDGE_STEPS]
+            with self.subTest(pos=pos):
+                self.assertEqual(table[pos].tolist(), expected)
+                self.assertEqual([hexagon_functions.get_neighbor(pos, edge) for edge in range(6)], expected)
+
+    def test_neighbors_are_adjacent(self):
+        # the six edge steps lead to the six fields at distance one, opposite edges are opposite steps
+        steps = hexagon_functions.EDGE_STEPS
+        self.assertEqual(sorted(steps), sorted(set(self.coords[1:7])))
+        self.assertTrue(all(steps[edge] == (-steps[edge - 3][0], -steps[edge - 3][1]) for edge in range(6)))
+
+
+if __name__ == "__main__":
+    unittest.main()
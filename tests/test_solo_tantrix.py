@@ -0,0 +1,209 @@
+"""
+Tests of the Tantrix game model: new puzzles on enlarged boards, the mismatch counts, the colored lines and the
+undo/redo history, each compared with a direct computation on the board
+
+python -m unittest discover tests
+"""
+import random
+import unittest
+
+import numpy as np
+
+import start_game
+from GUI.solo_tantrix import CODES, EDGE_COLORS, NO_TILE, Tantrix, batch_mismatches, reverse_direction
+
+
+def make_game(puzzle):
+    """Tantrix game of a puzzle [[fields], [tiles], [rotations]], placed like start_game.py does"""
+    codes, tile_offsets = start_game.transform_tantrix_puzzle_to_gui_format(puzzle)
+    expansion = start_game.calculate_puzzle_expansion(tile_offsets)
+    tiling_size = start_game.get_board_size(len(codes), expansion)
+    return Tantrix(codes, tiling_size, start_game.get_valid_gui_start_point(tiling_size, expansion), tile_offsets)
+
+
+class NewTiles(unittest.TestCase):
+
+    def setUp(self):
+        # straight line of 10 tiles, the board is enlarged beyond the pyramid size to fit it
+        self.game = make_game([[0, 1, 8, 19, 34, 53, 76, 103, 134, 169], [*range(10)], [0] * 10])
+
+    def test_enlarged_board(self):
+        self.assertGreater(self.game.get_tiling_size(), self.game.get_pyramid_size() + 2)
+        self.assertEqual(len(self.game.get_tile_value()), 10)
+
+    def test_new_tiles_on_enlarged_board(self):
+        for num_tiles in (None, 10, 7):
+            with self.subTest(num_tiles=num_tiles):
+                self.game.new_tiles(num_tiles)
+                board = self.game.get_board()
+                self.assertEqual(len(board), num_tiles or 10)
+                self.assertTrue(all(board.contains(grid_index) for grid_index in board.indices()))
+                self.assertEqual(board.get_tiling_size(), self.game.get_tiling_size())
+
+
+def random_moves(game, rng, moves):
+    """Generator of the game after each of a number of random recorded moves (rotations, moves, shifts, shuffles)"""
+    for _ in range(moves):
+        index = rng.choice(game.get_board().indices())
+        move = rng.randrange(6)
+        if move == 0:
+            game.rotate_tile(index)
+        elif move == 1:
+            game.rotate_tile_counterclock(index)
+        elif move in (2, 3):
+            neighbor = game.get_neighbor(index, rng.randrange(6))
+            if not game.get_board().contains(neighbor):
+                continue
+            game.move_tile(index, neighbor)
+        elif move == 4:
+            if not game.try_board_shift(rng.randrange(6)):
+                continue
+        elif rng.random() < 0.2:
+            game.shuffle_tiles()
+        else:
+            game.move_to_pyramid()
+        yield game
+
+
+def get_state(game):
+    """Snapshot arrays, tiles, Zobrist hash and mismatch count of the board as comparable tuple"""
+    tiles, rotations = game.get_snapshot()
+    return tiles.tobytes(), rotations.tobytes(), dict(game.get_tile_value()), game.get_hash(), game.get_mismatches()
+
+
+def count_mismatches(game):
+    """Number of mismatching edges, every pair of neighboring tiles checked on the codes"""
+    tile_value = game.get_tile_value()
+    return sum(code[direction] != tile_value[neighbor][reverse_direction(direction)]
+               for index, code in tile_value.items() for direction in range(6)
+               for neighbor in [game.get_neighbor(index, direction)] if neighbor in tile_value) // 2
+
+
+def find_lines(game, color):
+    """(number of tiles, is loop) of every line of the color, found by walking the matching edges of the board"""
+    tile_value = game.get_tile_value()
+    visited, lines = set(), []
+    for start, code in tile_value.items():
+        if start in visited or color not in code:
+            continue
+        line, stack, connections = {start}, [start], 0
+        while stack:
+            index = stack.pop()
+            for direction in range(6):
+                neighbor = game.get_neighbor(index, direction)
+                if tile_value[index][direction] == color and neighbor in tile_value and \
+                        tile_value[neighbor][reverse_direction(direction)] == color:
+                    connections += 1
+                    if neighbor not in line:
+                        line.add(neighbor)
+                        stack.append(neighbor)
+        visited |= line
+        lines.append((len(line), connections // 2 == len(line)))  # every connection is counted from both sides
+    return sorted(lines)
+
+
+class Mismatches(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = random.Random(2)
+
+    def test_incremental_count(self):
+        game = Tantrix(self.rng.sample(CODES, 15), None)
+        for step, game in enumerate(random_moves(game, self.rng, 300)):
+            with self.subTest(step=step):
+                self.assertEqual(game.get_mismatches(), count_mismatches(game))
+
+    def test_batch_mismatches_of_boards(self):
+        games = [Tantrix(self.rng.sample(CODES, num_tiles), 7) for num_tiles in (1, 3, 10, 20, 28)]
+        for game in games:
+            game.shuffle_tiles(seed=self.rng.randrange(1000))
+        tiles = np.stack([game.get_snapshot()[0] for game in games])
+        rotations = np.stack([game.get_snapshot()[1] for game in games])
+        mismatches, masks = batch_mismatches(tiles, rotations, return_masks=True)
+        self.assertEqual(mismatches.tolist(), [count_mismatches(game) for game in games])
+        self.assertFalse(masks[tiles == NO_TILE].any())  # empty cells have no edges
+
+    def test_batch_mismatches_of_cells(self):
+        # two cells side by side, direction 3 of the first one faces direction 0 of the second one
+        neighbors = np.array([[-1, -1, -1, 1, -1, -1], [0, -1, -1, -1, -1, -1]])
+        tiles = np.array([[tile_a, tile_b] for tile_a in range(4) for tile_b in range(4)] * 6)
+        rotations = np.array([[rotation, 5 - rotation] for rotation in range(6) for _ in range(16)])
+        expected = [int(EDGE_COLORS[tile_a, rotation_a, 3] != EDGE_COLORS[tile_b, rotation_b, 0])
+                    for (tile_a, tile_b), (rotation_a, rotation_b) in zip(tiles.tolist(), rotations.tolist())]
+        self.assertEqual(batch_mismatches(tiles, rotations, neighbors).tolist(), expected)
+
+
+class Lines(unittest.TestCase):
+
+    def test_lines_after_moves(self):
+        rng = random.Random(1)
+        for num_tiles in (3, 10, 14, 20):
+            game = Tantrix(rng.sample(CODES[:14] if num_tiles <= 14 else CODES, num_tiles), None)
+            for step, game in enumerate(random_moves(game, rng, 150)):
+                if step % 10 == 0:
+                    game.undo(3)
+                for color in "RBYG":
+                    with self.subTest(num_tiles=num_tiles, step=step, color=color):
+                        self.assertEqual(sorted(game.get_lines(color)), find_lines(game, color))
+
+    def test_loop(self):
+        # three tiles around a common corner, each with the yellow arc on the two edges facing the other tiles
+        game = Tantrix(["RBYYRB", "BRBRYY", "YYBBRR"], None)
+        self.assertTrue(game.has_loop("Y", 3))
+        for color in "RBYG":
+            with self.subTest(color=color):
+                lines = find_lines(game, color)
+                self.assertEqual(sorted(game.get_lines(color)), lines)
+                self.assertEqual(game.has_loop(color, 3), (3, True) in lines)
+
+
+class History(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = random.Random(5)
+        self.game = Tantrix(self.rng.sample(CODES, 20), None)
+        self.history = self.game.get_history()
+        self.history.max_size = 60  # small enough that old steps are dropped
+        self.history.checkpoint_interval = 7
+        # state after every step, the undone steps are removed when a new move discards them
+        self.states = [get_state(self.game)]
+        for step, game in enumerate(random_moves(self.game, self.rng, 200)):
+            self.states.append(get_state(game))
+            if step % 25 == 24:
+                steps = self.rng.randint(1, 5)
+                self.game.undo(steps)
+                del self.states[-steps:]
+
+    def test_bounded(self):
+        self.assertEqual(self.history.position, len(self.states) - 1)
+        self.assertGreater(self.history.first, 0)
+        self.assertLessEqual(len(self.history), self.history.max_size + self.history.checkpoint_interval)
+
+    def test_go_to_step(self):
+        for _ in range(100):
+            step = self.rng.randint(self.history.first, self.history.first + len(self.history))
+            self.game.go_to_step(step)
+            with self.subTest(step=step):
+                self.assertEqual(get_state(self.game), self.states[step])
+
+    def test_undo_redo(self):
+        while self.game.undo():
+            self.assertEqual(get_state(self.game), self.states[self.history.position])
+        self.assertEqual(self.history.position, self.history.first)
+        while self.game.redo():
+            self.assertEqual(get_state(self.game), self.states[self.history.position])
+        self.assertEqual(get_state(self.game), self.states[-1])
+
+    def test_record_board(self):
+        self.game.clear_board()
+        self.game.place_tile((0, 0, self.game.get_tiling_size()), CODES[0])
+        self.game.record_board()
+        changed = get_state(self.game)
+        self.assertTrue(self.game.undo())
+        self.assertEqual(get_state(self.game), self.states[-1])
+        self.assertTrue(self.game.redo())
+        self.assertEqual(get_state(self.game), changed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+Round trip of solved boards through the solution store: save, query by the tile set and load onto a game board
+
+python -m unittest discover tests
+"""
+import unittest
+
+import puzzle_generator
+import solution_store
+import start_game
+import symmetry
+from GUI.solo_tantrix import Tantrix
+from GUI.tile_codes import encode_board
+
+
+def make_game(puzzle):
+    """Tantrix game of a puzzle [[fields], [tiles], [rotations]], placed like start_game.py does"""
+    codes, tile_offsets = start_game.transform_tantrix_puzzle_to_gui_format(puzzle)
+    expansion = start_game.calculate_puzzle_expansion(tile_offsets)
+    tiling_size = start_game.get_board_size(len(codes), expansion)
+    return Tantrix(codes, tiling_size, start_game.get_valid_gui_start_point(tiling_size, expansion), tile_offsets)
+
+
+class SolutionStoreRoundTrip(unittest.TestCase):
+
+    def setUp(self):
+        self.store = solution_store.SolutionStore(":memory:")
+        # mirror images of most of these pyramids consist of other tiles
+        self.puzzles = [puzzle_generator.generate_puzzle(10, "pyramid", seed=seed) for seed in range(50)]
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_save_query_load(self):
+        for puzzle, solution in self.puzzles:
+            with self.subTest(tiles=solution[1]):
+                self.assertTrue(self.store.add_solution(solution))
+                found = self.store.find_solutions(tiles=solution[1])
+                self.assertEqual([sorted(tiles) for _, tiles, _ in found], [sorted(solution[1])])
+                game = make_game(puzzle)
+                self.assertTrue(solution_store.load_solution(game, self.store))
+                self.assertEqual(game.get_mismatches(), 0)
+                tiles, _ = encode_board(game.get_tile_value().values())
+                self.assertEqual(sorted(tiles), sorted(solution[1]))
+
+    def test_rotated_copy_is_duplicate(self):
+        _, solution = self.puzzles[0]
+        self.assertTrue(self.store.add_solution(solution))
+        cells = symmetry.get_cells(solution)
+        for _ in range(5):
+            cells = [(symmetry.rotate_cell(cell), symmetry.rotate_code(code)) for cell, code in cells]
+            self.assertFalse(self.store.add_solution(dict(cells)))
+        self.assertEqual(len(self.store), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+"""
+Tests of the canonical forms and the deduplication of symmetry.py
+
+python -m unittest discover tests
+"""
+import unittest
+
+import puzzle_generator
+import symmetry
+from GUI.tile_codes import encode_board
+
+
+def transform(cells, cell_function, code_function):
+    """GUI format puzzle {(h, k, l): code} of the transformed cells"""
+    return {cell_function(cell): code_function(code) for cell, code in cells}
+
+
+class Deduplicate(unittest.TestCase):
+
+    def setUp(self):
+        # a solution whose mirror image consists of other tiles
+        for seed in range(50):
+            _, solution = puzzle_generator.generate_puzzle(10, "pyramid", seed=seed)
+            cells = symmetry.get_cells(solution)
+            mirrored = transform(cells, symmetry.mirror_cell, symmetry.mirror_code)
+            if sorted(encode_board(mirrored.values())[0]) != sorted(solution[1]):
+                break
+        self.solution, self.cells, self.mirrored = solution, cells, mirrored
+        self.rotated = transform(cells, symmetry.rotate_cell, symmetry.rotate_code)
+
+    def test_mirror_image_kept_without_mirror(self):
+        unique = list(symmetry.deduplicate([self.solution, self.mirrored, self.rotated]))
+        self.assertEqual(unique, [self.solution, self.mirrored])
+        self.assertEqual(list(symmetry.deduplicate([self.solution, self.mirrored], mirror=False)),
+                         [self.solution, self.mirrored])
+
+    def test_mirror_image_merged_with_mirror(self):
+        unique = list(symmetry.deduplicate([self.solution, self.mirrored, self.rotated], mirror=True))
+        self.assertEqual(unique, [self.solution])
+
+    def test_canonical_puzzle_keeps_tiles_without_mirror(self):
+        for arrangement in (self.solution, self.mirrored, self.rotated):
+            with self.subTest(arrangement=arrangement):
+                expected = sorted(encode_board(code for _, code in symmetry.get_cells(arrangement))[0])
+                self.assertEqual(sorted(symmetry.get_canonical_puzzle(arrangement, mirror=False)[1]), expected)
+        self.assertEqual(symmetry.get_canonical_key(self.solution, mirror=False),
+                         symmetry.get_canonical_key(self.rotated, mirror=False))
+
+
+if __name__ == "__main__":
+    unittest.main()